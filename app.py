@@ -1,14 +1,27 @@
 # app.py - Adding Spine Text via Canvas Texture
 # --- Imports ---
-from flask import Flask, request, render_template_string, jsonify
+from flask import Flask, request, render_template_string, jsonify, url_for, Response
+import json
 import requests
-from bs4 import BeautifulSoup
 import os
 import threading
 import re
 from urllib.parse import quote_plus
 import io
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from spine_cache import get_default_cache
+from cover_store import get_default_store, COVER_SIZES
+import shelf_sync
+import shelf_scraper
+import shelf_export
+from http_client import get_client
+from scrape_jobs import JobManager, new_progress
+from shelf_cache import ShelfResultCache
+from email.utils import formatdate
+import metrics
+from spine_colors import edge_color_from_bytes, EDGE_COLOR_MODE
 
 # --- Pillow Check ---
 try:
@@ -20,78 +33,201 @@ except ImportError:
     ImageStat = None
 
 # --- Global Data ---
-progress_data = {
-    "total_books": 0, "books_processed": 0, "complete": False, "error": None
-}
+progress_lock = threading.Lock() # Guards books_processed, which cover workers bump concurrently
+COVER_WORKERS = int(os.environ.get("COVER_WORKERS", "8")) # Max covers downloaded/decoded at once
+PAGE_RETRY_DELAYS = [float(s) for s in os.environ.get("PAGE_RETRY_DELAYS", "10,60,300").split(",") if s.strip()] # Seconds before each background re-scrape of a shelf with failed pages
 
 # --- Helper Functions (From User's Code) ---
-def get_edge_color(image_url, edge_width_percent=10):
+def get_edge_color(image_url, edge_width_percent=10, mode=None):
     # ... (Code Provided By User - Assumed OK) ...
     if not Image or not ImageStat or not io: return "#808080"
+    cache = get_default_cache() if edge_width_percent == 10 else None # Cache only holds default-strip colors
+    mode = mode or EDGE_COLOR_MODE # Part of the cache key: fast and full decodes can differ slightly
+    with metrics.span("spine_cache"): cached_color = cache.get(image_url, mode) if cache else None
+    if cache: metrics.inc("cache_lookups", cache="spine_color", result="hit" if cached_color else "miss")
+    if cached_color: metrics.inc("covers", result="cached"); return cached_color
     try:
-        response = requests.get(image_url, stream=True, timeout=10); response.raise_for_status()
-        img = Image.open(io.BytesIO(response.content))
-        if img.mode not in ('RGB', 'L'): img = img.convert('RGB')
-        img_width, img_height = img.size
-        if img_width <= 1 or img_height <= 0: return "#808080"
-        width = max(1, int(img.width * (edge_width_percent / 100)))
-        if width > img_width: width = img_width
-        edge = img.crop((0, 0, width, img.height)); stat = ImageStat.Stat(edge)
-        avg_color = (128,128,128);
-        if hasattr(stat, 'mean') and stat.mean:
-             avg_color_float = stat.mean
-             if isinstance(avg_color_float, (list, tuple)) and len(avg_color_float) >= 1:
-                 avg_color = tuple(int(c) for c in avg_color_float[:3])
-                 if len(avg_color) == 1: avg_color = (avg_color[0],)*3
-             elif isinstance(avg_color_float, (int, float)):
-                 gray_val = int(avg_color_float); avg_color = (gray_val,)*3
-        if len(avg_color) < 3: avg_color = (avg_color[0],)*3 if len(avg_color)>0 else (128,)*3
-        hex_color = "#{:02x}{:02x}{:02x}".format(*avg_color[:3])
-        return hex_color
-    except Exception as e: print(f"Warn: Img process fail {image_url.split('/')[-1]} {e}"); return "#808080"
-
-def get_books_from_shelf(url):
+        with metrics.span("cover_load"): image_bytes = get_default_store().original(image_url) # Same stored bytes the /cover proxy serves
+        hex_color = edge_color_from_bytes(image_bytes, edge_width_percent, mode)
+        if cache: cache.set(image_url, mode, hex_color) # Failures fall through to "#808080" and are never cached
+        metrics.inc("covers", result="computed"); return hex_color
+    except Exception as e: print(f"Warn: Img process fail {image_url.split('/')[-1]} {e}"); metrics.inc("covers", result="failed"); metrics.inc("errors", stage="cover"); return "#808080"
+
+def _count_processed_cover(progress):
+    # Runs on the worker thread once a spine color is finished
+    with progress_lock: progress["books_processed"] += 1
+
+class _OrderedBookEmitter:
+    # Hands books to on_book(index, book) in shelf order as soon as every earlier spine color is finished
+    def __init__(self, on_book): self.on_book = on_book; self.books = []; self.sent = 0; self._lock = threading.Lock()
+    def add(self, book):
+        with self._lock: self.books.append(book)
+    def drain(self):
+        with self._lock:
+            while self.sent < len(self.books):
+                color = self.books[self.sent]["spine_color"]
+                if not isinstance(color, str):
+                    if not color.done(): return
+                    color = color.result()
+                self.on_book(self.sent, {**self.books[self.sent], "spine_color": color}); self.sent += 1
+
+def get_books_from_shelf(url, cover_workers=None, incremental=True, page_workers=None, progress=None, on_book=None):
     # ... (Code Provided By User - Including Author/Publisher Scraping) ...
-    global progress_data; progress_data = {"total_books":0,"books_processed":0,"complete":False,"error":None}; books=[]; headers={"User-Agent":"Mozilla/5.0"}
+    # Pages come from shelf_scraper (concurrent fetch when the count is known, parsed in shelf order).
+    # Spine colors are computed on a bounded pool so page parsing overlaps cover downloads; book order follows the shelf.
+    # With incremental=True only pages up to the first review stored by the last sync are fetched.
+    # `progress` (see scrape_jobs.new_progress) is updated in place so a job can report it while this runs.
+    # on_book(index, book) is called for each finished book, in shelf order, while the scrape is still running.
+    # Each page is checkpointed (rows plus spine colors) once its colors are in; a failed page after the first
+    # doesn't stop the scrape, and the next scrape of the shelf only fetches the pages the checkpoint lacks.
+    # progress["pages"] gets every page's status; progress["failed_pages"] lists the ones still missing.
+    progress_data = progress if progress is not None else new_progress(); books=[]
+    emitter = _OrderedBookEmitter(on_book) if on_book else None
+    def _cover_done(_future):
+        _count_processed_cover(progress_data)
+        if emitter: emitter.drain()
+    stored_books = shelf_sync.load_books(url, "app") if incremental and shelf_sync.supports_incremental(url) else []
+    known_ids = {b["review_id"] for b in stored_books if b.get("review_id")}
+    progress_data["books_processed"] = len(stored_books)
+    checkpoint = shelf_sync.PageCheckpoint(url, "app"); page_status = {}; fetched_books = []; unsaved_pages = [] # (number, books) awaiting spine colors
+    def _resume(first_page):
+        # Pages the checkpoint holds, if page 1 shows the shelf hasn't changed since it was written
+        first_ids = [b["review_id"] for b in first_page.books]
+        if checkpoint.matches(first_page.total_books, first_ids): print(f"Resuming: {len(checkpoint.pages)} pages checkpointed."); return set(checkpoint.pages)
+        checkpoint.start(first_page.total_books, first_ids); return set()
+    def _save_finished_pages():
+        for number, page_books in [p for p in unsaved_pages if all(b["spine_color"].done() for b in p[1])]:
+            checkpoint.add(number, [{**b, "spine_color": b["spine_color"].result()} for b in page_books]); unsaved_pages.remove((number, page_books))
+    cover_pool = ThreadPoolExecutor(max_workers=max(1, cover_workers or COVER_WORKERS), thread_name_prefix="cover")
     try:
-        page = 1
-        initial_response = requests.get(f"{url}&page=1", headers=headers, timeout=15); initial_response.raise_for_status()
-        initial_soup = BeautifulSoup(initial_response.text, "html.parser"); count_elem = initial_soup.select_one('#shelfHeader .greyText'); total_books = 0
-        if count_elem and 'books)' in count_elem.text: match = re.search(r'of (\d+) books', count_elem.text); total_books = int(match.group(1)) if match else 0
-        if total_books == 0: count_elem_fallback = initial_soup.select_one('.selectedShelf'); total_books = int(''.join(filter(str.isdigit, count_elem_fallback.text))) if count_elem_fallback else 0
-        if total_books == 0: total_books = 1
-        progress_data["total_books"] = total_books
-        while True:
-            current_url = f"{url}&page={page}";
-            print(f"Scraping page {page}...")
-            if page == 1: response = initial_response; soup = initial_soup
-            else:
-                try: response = requests.get(current_url, headers=headers, timeout=10); response.raise_for_status()
-                except requests.exceptions.RequestException as page_err: print(f"Error page {page}: {page_err}."); progress_data["error"] = f"Warn: Failed page {page}."; break
-                soup = BeautifulSoup(response.text, "html.parser")
-            rows = soup.select('tr[id^="review_"]')
-            if not rows: break
-            for row in rows:
-                title_elem=row.select_one('td.field.title .value a'); author_elem=row.select_one('td.field.author .value a'); image_elem=row.select_one('td.field.cover img'); publisher_elem = row.select_one('td.field.publisher .value') # Added publisher selector
-                if title_elem and author_elem: # Ensure title and author exist
-                    raw_image_url = image_elem.get("src") if image_elem else ""; high_res_image_url = raw_image_url
-                    if raw_image_url: high_res_image_url = re.sub(r'\._S[XY]?\d+_?\.', '.', raw_image_url)
-                    spine_color = get_edge_color(high_res_image_url) if image_elem and high_res_image_url and Image else "#808080"
-                    author_name = author_elem.text.strip() # Get author text
-                    publisher_name = publisher_elem.text.strip() if publisher_elem else "" # Get publisher text safely
-                    books.append({
-                        "title": title_elem.text.strip(),
-                        "author": author_name, # Include author
-                        "publisher": publisher_name, # Include publisher
-                        "image": high_res_image_url,
-                        "spine_color": spine_color
-                    })
-                    progress_data["books_processed"] = len(books)
-            page += 1
+        for page in shelf_scraper.iter_shelf_pages(url, known_ids=known_ids, stored_count=len(stored_books), page_workers=page_workers, skip_pages=_resume, skip_failed=True):
+            print(f"Scraping page {page.number}...")
+            if page.number == 1: progress_data["total_books"] = page.total_books or 1; progress_data["shelf_info"] = {"total_books": page.total_books, "validators": page.validators}
+            if page.error:
+                print(f"Error page {page.number}: {page.error}."); metrics.inc("errors", stage="scrape")
+                page_status[page.number] = {"page": page.number, "status": "failed", "books": 0, "error": page.error}; continue
+            if page.number in checkpoint.pages: # Rows and spine colors from an earlier, unfinished scrape
+                resumed = [dict(b) for b in checkpoint.pages[page.number]]; books.extend(resumed)
+                with progress_lock: progress_data["books_processed"] += len(resumed)
+                if emitter:
+                    for book in resumed: emitter.add(book)
+                    emitter.drain()
+                page_status[page.number] = {"page": page.number, "status": "resumed", "books": len(resumed)}; continue
+            page_books = []
+            for record in page.books:
+                if not (record["title"] and record["author"]): continue # Ensure title and author exist
+                high_res_image_url = shelf_scraper.high_res_cover_url(record["image"]) or ""
+                if high_res_image_url and Image: spine_future = cover_pool.submit(get_edge_color, high_res_image_url)
+                else: spine_future = cover_pool.submit(lambda: "#808080")
+                book = {
+                    "review_id": record["review_id"],
+                    "title": record["title"],
+                    "author": record["author"], # Include author
+                    "publisher": record["publisher"] or "", # Include publisher
+                    "image": high_res_image_url,
+                    "rating": record["rating"], # Kept for the shelf_export rows
+                    "review": record["review"],
+                    "cover_id": get_default_store().register(high_res_image_url), # Served resized at /cover/<cover_id>
+                    "spine_color": spine_future # Resolved once all pages are parsed
+                }
+                books.append(book); page_books.append(book); fetched_books.append(book)
+                if emitter: emitter.add(book)
+                spine_future.add_done_callback(_cover_done)
+            page_status[page.number] = {"page": page.number, "status": "fetched", "books": len(page_books)}
+            unsaved_pages.append((page.number, page_books)); _save_finished_pages()
+        with metrics.span("spine_wait"): # Time the page loop finished ahead of the cover pool
+            for book in books:
+                if not isinstance(book["spine_color"], str): book["spine_color"] = book["spine_color"].result() # get_edge_color never raises
+        failed_pages = sorted(n for n, status in page_status.items() if status["status"] == "failed")
+        progress_data["pages"] = [page_status[n] for n in sorted(page_status)]; progress_data["failed_pages"] = failed_pages
+        if failed_pages:
+            progress_data["error"] = f"Warn: Failed page{'s' if len(failed_pages) > 1 else ''} {', '.join(map(str, failed_pages))}."
+            for number, page_books in unsaved_pages: checkpoint.add(number, page_books)
+        else: checkpoint.clear() # Complete: the sync state saved below takes over
+        if fetched_books:
+            try:
+                with shelf_export.open_export(url) as export: # SHELF_EXPORT_JSONL / SHELF_EXPORT_PARQUET; only books fetched by this scrape
+                    for book in fetched_books: export.add(book)
+            except Exception as e: print(f"Warn: Export failed ({type(e).__name__}: {e}); books still returned and saved."); metrics.inc("errors", stage="export")
+        if stored_books: print(f"Incremental sync: {len(books)} new, {len(stored_books)} stored.")
+        new_count = len(books); books = shelf_sync.merge_books(books, stored_books)
+        for book in books[new_count:]: book["cover_id"] = get_default_store().register(book.get("image")) # State saved before covers were proxied lacks it
+        if emitter:
+            emitter.drain() # Flush anything a cover callback hasn't yet
+            for book in books[new_count:]: emitter.add(book)
+            emitter.drain()
+        if books and not progress_data.get("error"): shelf_sync.save_books(url, "app", books) # A partial sync would leave a gap
         if not books and not progress_data.get("error"): progress_data["error"] = "No books found."
         progress_data["total_books"] = progress_data.get("books_processed", 0)
         progress_data["complete"] = True; print(f"Scraping finished. Found: {len(books)}"); return books
-    except Exception as e: print(f"Scraping error: {e}"); traceback.print_exc(); progress_data["error"] = str(e); progress_data["complete"] = True; return None
+    except Exception as e: print(f"Scraping error: {e}"); traceback.print_exc(); progress_data["error"] = str(e); progress_data["complete"] = True; metrics.inc("errors", stage="scrape"); return None
+    finally: cover_pool.shutdown(wait=False, cancel_futures=True)
+
+# --- Shelf Result Cache ---
+shelf_results = ShelfResultCache()
+
+def get_books_cached(url, progress=None, on_book=None):
+    # get_books_from_shelf behind the shelf result cache; progress gets cache_status/cache_stored_at
+    progress = progress if progress is not None else new_progress()
+    with metrics.span("shelf_cache"): entry, status = shelf_results.lookup(url)
+    if entry is not None: # HIT or REVALIDATED: replay the stored result
+        books = entry["books"]; progress.update(total_books=len(books), books_processed=len(books), complete=True)
+        if on_book:
+            for index, book in enumerate(books): on_book(index, book)
+    else:
+        with metrics.span("scrape"): books = get_books_from_shelf(url, progress=progress, on_book=on_book)
+        if books and not progress.get("error"): entry = shelf_results.store(url, books, progress.get("shelf_info"))
+        if progress.get("failed_pages"): progress["retry"] = schedule_page_retry(url)
+        elif books is not None: forget_page_retries(url)
+    progress["cache_status"] = status; progress["cache_stored_at"] = entry["stored_at"] if entry else None
+    if books: metrics.inc("books", len(books))
+    print(f"Shelf cache {status}: {url}")
+    return books
+
+# --- Background Page Retries ---
+_page_retries = {} # shelf key -> {"attempt": retries scheduled so far, "at": when the latest runs, "timer": its pending Timer, "running": its job is in progress}
+_page_retries_lock = threading.Lock()
+
+def schedule_page_retry(url):
+    # Re-scrapes the shelf after the next PAGE_RETRY_DELAYS delay; the checkpoint means only missing pages are fetched.
+    # Returns {"attempt", "at"} for the response, or None once every delay is used up (a new request still resumes).
+    key = shelf_sync.shelf_key(url)
+    with _page_retries_lock:
+        state = _page_retries.setdefault(key, {"attempt": 0, "at": None, "timer": None, "running": False})
+        if state["timer"] or state["running"]: return {"attempt": state["attempt"], "at": state["at"]} # Already queued or in progress
+        return _queue_page_retry(url, key, state)
+
+def _queue_page_retry(url, key, state):
+    # Caller holds _page_retries_lock
+    if state["attempt"] >= len(PAGE_RETRY_DELAYS): return None
+    delay = PAGE_RETRY_DELAYS[state["attempt"]]; state["attempt"] += 1; state["at"] = time.time() + delay
+    state["timer"] = threading.Timer(delay, _run_page_retry, (url, key)); state["timer"].daemon = True; state["timer"].start()
+    print(f"Retrying failed pages of {url} in {delay:g}s (attempt {state['attempt']}/{len(PAGE_RETRY_DELAYS)})")
+    return {"attempt": state["attempt"], "at": state["at"]}
+
+def _run_page_retry(url, key):
+    # Timer thread: runs one retry as a scrape job, then queues the next attempt or forgets the shelf
+    with _page_retries_lock:
+        state = _page_retries.get(key)
+        if not state: return # Cancelled by a scrape that finished the shelf
+        state["timer"] = None; state["running"] = True
+    job = jobs.submit(url); job.wait()
+    with _page_retries_lock:
+        if _page_retries.get(key) is not state: return # The shelf completed meanwhile
+        state["running"] = False
+        retry = _queue_page_retry(url, key, state) if job.progress.get("failed_pages") else None
+        if retry is None: del _page_retries[key]
+        if job.progress.get("failed_pages"): job.progress["retry"] = retry # Replaces the in-progress attempt the job reported
+
+def forget_page_retries(url):
+    with _page_retries_lock:
+        state = _page_retries.pop(shelf_sync.shelf_key(url), None)
+    if state and state["timer"]: state["timer"].cancel()
+
+def with_cache_headers(response, progress):
+    if progress.get("cache_status"): response.headers["X-Cache-Status"] = progress["cache_status"]
+    if progress.get("cache_stored_at"): response.headers["X-Cache-Stored-At"] = formatdate(progress["cache_stored_at"], usegmt=True)
+    return response
 
 # --- Flask App ---
 app = Flask(__name__)
@@ -135,13 +271,36 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
         const SPINE_PUBLISHER_SIZE_PX = 6; // Adjusted size
         const SPINE_PADDING_PX = 15;      // Adjusted padding
         const SPINE_TEXT_OPACITY = 0.66;
+        // --- Instanced Rendering Constants ---
+        const RENDER_MODE = new URLSearchParams(window.location.search).get('render') === 'mesh' ? 'mesh' : 'instanced';
+        const CHUNK_SIZE = 128; // Books per InstancedMesh and atlas pair
+        const SPINE_ATLAS = { WIDTH: 2048, HEIGHT: 2048, CELL_W: SPINE_TEXTURE_WIDTH, CELL_H: SPINE_TEXTURE_HEIGHT }; // 36 x 4 cells
+        const COVER_ATLAS = { WIDTH: 1024, HEIGHT: 1024, CELL_W: 64, CELL_H: Math.round(64 * BOOK_DEFAULTS.HEIGHT / BOOK_DEFAULTS.WIDTH) }; // 16 x 10 cells; covers are seen almost edge-on
+        // --- Viewport Window Constants (default; ?window=all builds and loads every book) ---
+        const WINDOWED = new URLSearchParams(window.location.search).get('window') !== 'all';
+        const WINDOW_MARGIN = 4; // Books kept ready above and below the visible ones
+        const WINDOW_PREFETCH = 8; // Extra books readied in the direction the stack is moving
+        const COVER_POOL_SIZE = 64; // Cover textures kept on the GPU (mesh mode); least recently used are disposed
+        const ATLAS_POOL_SIZE = 3; // Chunks whose atlases stay on the GPU (instanced mode)
 
 
         // --- DOM Elements ---
         const inputContainer=document.getElementById('input-container'); const loadingMessage=document.getElementById('loading-message'); const shelfForm=document.getElementById('shelfForm'); const shelfUrlInput=document.getElementById('shelfUrl'); const statsDiv=document.getElementById('stats'); const canvasContainer=document.getElementById('canvas-container'); const progressBarFill=document.getElementById('progress-fill'); const statusText=document.getElementById('status-text');
 
         // --- Three.js Variables ---
-        let scene, camera, renderer; let bookData=[]; const textureLoader=new THREE.TextureLoader(); const booksGroup=new THREE.Group(); let currentScrollY=window.scrollY; let targetGroupY=0; let animationFrameId=null; let progressIntervalId=null;
+        let scene, camera, renderer; let bookData=[]; const textureLoader=new THREE.TextureLoader(); const booksGroup=new THREE.Group(); let currentScrollY=window.scrollY; let targetGroupY=0; let animationFrameId=null; let eventSource=null; let layoutCount=0; let nextAnimAt=0;
+        let sharedBookGeometry=null; let sharedPageMaterial=null; const chunks=[]; const instancedBooks=[]; const imageLoader=new THREE.ImageLoader(); const instanceMatrix=new THREE.Matrix4(); const instancePosition=new THREE.Vector3(); const instanceScale=new THREE.Vector3(1, 1, 1); const instanceQuaternion=new THREE.Quaternion().setFromEuler(new THREE.Euler(TARGET_ROTATION_X, TARGET_ROTATION_Y, 0, 'YXZ'));
+        let windowFirst=0; let windowLast=-1; const bookMeshes=new Map(); // index -> mesh, only for books in the window (mesh mode)
+
+        // --- Helper: LRU Pool (Map iteration order is recency order) ---
+        class LruPool {
+             constructor(limit, onEvict) { this.limit = limit; this.onEvict = onEvict; this.entries = new Map(); }
+             get(key) { if (!this.entries.has(key)) return undefined; const value = this.entries.get(key); this.entries.delete(key); this.entries.set(key, value); return value; }
+             set(key, value) { this.entries.delete(key); this.entries.set(key, value); while (this.entries.size > this.limit) { const [oldKey, oldValue] = this.entries.entries().next().value; this.entries.delete(oldKey); this.onEvict(oldValue, oldKey); } }
+             clear() { this.entries.forEach((value, key) => this.onEvict(value, key)); this.entries.clear(); }
+         }
+        const coverTextures = new LruPool(WINDOWED ? COVER_POOL_SIZE : Infinity, (texture) => texture.dispose()); // Cover URL -> texture
+        const residentAtlases = new LruPool(WINDOWED ? ATLAS_POOL_SIZE : Infinity, (chunk) => { chunk.spineAtlas.texture.dispose(); chunk.coverAtlas.texture.dispose(); }); // Re-uploaded from the canvases if the chunk comes back
 
         // --- Helper: Get Contrast Color (Copied from previous step) ---
         function getContrastColor(hexColor) {
@@ -159,7 +318,17 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
             canvas.width = widthPx; canvas.height = heightPx;
             const ctx = canvas.getContext('2d');
             if (!ctx) return null; // Check if context is available
+            paintSpine(ctx, book, widthPx, heightPx);
+
+            // Create and return texture
+            const texture = new THREE.CanvasTexture(canvas);
+            texture.colorSpace = THREE.SRGBColorSpace;
+            texture.needsUpdate = true;
+            return texture;
+        }
 
+        // --- Helper: Paint a Spine at the Context Origin (own canvas or an atlas cell) ---
+        function paintSpine(ctx, book, widthPx, heightPx) {
             // 1. Background
             ctx.fillStyle = book.spine_color || '#808080';
             ctx.fillRect(0, 0, widthPx, heightPx);
@@ -213,32 +382,129 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
             ctx.globalAlpha = 1.0;
 
             ctx.restore(); // Restore context rotation
-
-            // Create and return texture
-            const texture = new THREE.CanvasTexture(canvas);
-            texture.colorSpace = THREE.SRGBColorSpace;
-            texture.needsUpdate = true;
-            return texture;
         }
 
+        // --- Instanced Rendering (default; ?render=mesh keeps one mesh per book) ---
+        // Books share one box geometry and page material. Each chunk of CHUNK_SIZE books is a single
+        // InstancedMesh (3 draw calls: pages, spines, covers) whose spines and covers are painted
+        // into one atlas each; the shader picks an instance's atlas cell from gl_InstanceID.
+        function createSharedBookGeometry() { /* Faces regrouped so the four page faces are one draw call */
+             const geometry = new THREE.BoxGeometry(BOOK_DEFAULTS.WIDTH, BOOK_DEFAULTS.HEIGHT, BOOK_DEFAULTS.THICKNESS); const index = Array.from(geometry.index.array);
+             const faceIndices = (face) => index.slice(face * 6, face * 6 + 6); // Box faces: R, L(-X/Spine), T, B, F(+Z/Cover), Bk
+             geometry.setIndex([0, 2, 3, 5, 1, 4].flatMap(faceIndices)); geometry.clearGroups(); geometry.addGroup(0, 24, 0); geometry.addGroup(24, 6, 1); geometry.addGroup(30, 6, 2);
+             return geometry;
+         }
+        function createAtlas(spec, background) {
+             const canvas = document.createElement('canvas'); canvas.width = spec.WIDTH; canvas.height = spec.HEIGHT; const ctx = canvas.getContext('2d'); ctx.fillStyle = background; ctx.fillRect(0, 0, spec.WIDTH, spec.HEIGHT);
+             const texture = new THREE.CanvasTexture(canvas); texture.colorSpace = THREE.SRGBColorSpace; texture.minFilter = THREE.LinearFilter; texture.generateMipmaps = false; // Mipmaps would bleed neighbouring cells together
+             return { ctx, texture, spec, cols: Math.floor(spec.WIDTH / spec.CELL_W), dirty: false };
+         }
+        function atlasCellOrigin(atlas, slot) { return [(slot % atlas.cols) * atlas.spec.CELL_W, Math.floor(slot / atlas.cols) * atlas.spec.CELL_H]; }
+        function createAtlasMaterial(atlas) {
+             const material = new THREE.MeshStandardMaterial({ map: atlas.texture, color: 0xffffff, roughness: 0.8, metalness: 0.1 });
+             material.onBeforeCompile = (shader) => {
+                 shader.uniforms.atlasCols = { value: atlas.cols }; shader.uniforms.atlasCell = { value: new THREE.Vector2(atlas.spec.CELL_W / atlas.spec.WIDTH, atlas.spec.CELL_H / atlas.spec.HEIGHT) };
+                 shader.vertexShader = shader.vertexShader.replace('#include <common>', '#include <common>\\nuniform float atlasCols; uniform vec2 atlasCell;').replace('#include <uv_vertex>',
+                     '#include <uv_vertex>\\nvec2 atlasCellIndex = vec2(mod(float(gl_InstanceID), atlasCols), floor(float(gl_InstanceID) / atlasCols)); vMapUv = vec2(atlasCellIndex.x * atlasCell.x, 1.0 - (atlasCellIndex.y + 1.0) * atlasCell.y) + vMapUv * atlasCell;');
+             };
+             material.customProgramCacheKey = () => `atlas-${atlas.cols}-${atlas.spec.CELL_W}x${atlas.spec.CELL_H}`;
+             return material;
+         }
+        function getChunk(chunkIndex) {
+             if (!sharedBookGeometry) { sharedBookGeometry = createSharedBookGeometry(); sharedPageMaterial = new THREE.MeshStandardMaterial({ color: PAGE_COLOR, roughness: 0.95, metalness: 0.05 }); }
+             while (chunks.length <= chunkIndex) {
+                 const spineAtlas = createAtlas(SPINE_ATLAS, '#808080'); const coverAtlas = createAtlas(COVER_ATLAS, '#ffffff'); // Covers stay white until their image loads
+                 const mesh = new THREE.InstancedMesh(sharedBookGeometry, [sharedPageMaterial, createAtlasMaterial(spineAtlas), createAtlasMaterial(coverAtlas)], CHUNK_SIZE);
+                 mesh.count = 0; mesh.frustumCulled = false; mesh.instanceMatrix.setUsage(THREE.DynamicDrawUsage); booksGroup.add(mesh); chunks.push({ mesh, spineAtlas, coverAtlas });
+             }
+             return chunks[chunkIndex];
+         }
+        function drawCover(atlas, slot, image) { /* Centre-crops the cover to the book's aspect, as the per-mesh texture offset does */
+             const [x, y] = atlasCellOrigin(atlas, slot); const cellAspect = atlas.spec.CELL_W / atlas.spec.CELL_H; let sw = image.naturalWidth; let sh = image.naturalHeight;
+             if (sw / sh > cellAspect) { sw = sh * cellAspect; } else { sh = sw / cellAspect; }
+             atlas.ctx.drawImage(image, (image.naturalWidth - sw) / 2, (image.naturalHeight - sh) / 2, sw, sh, x, y, atlas.spec.CELL_W, atlas.spec.CELL_H); atlas.dirty = true;
+         }
+        function addInstancedBook(book, index) {
+             const chunk = getChunk(Math.floor(index / CHUNK_SIZE)); const slot = index % CHUNK_SIZE; const entry = { index, chunk, slot, x: 0 };
+             const [x, y] = atlasCellOrigin(chunk.spineAtlas, slot); const ctx = chunk.spineAtlas.ctx;
+             ctx.save(); ctx.translate(x, y); ctx.beginPath(); ctx.rect(0, 0, SPINE_ATLAS.CELL_W, SPINE_ATLAS.CELL_H); ctx.clip(); paintSpine(ctx, book, SPINE_ATLAS.CELL_W, SPINE_ATLAS.CELL_H); ctx.restore(); chunk.spineAtlas.dirty = true;
+             instancedBooks[index] = entry; chunk.mesh.count = Math.max(chunk.mesh.count, slot + 1); entry.book = book; entry.coverRequested = false;
+             return entry;
+         }
+        function coverSrc(book) { return book.cover_id ? `/cover/${book.cover_id}?size=texture` : book.image; } // Local proxy; older cached results only have the Goodreads URL
+        function requestCover(entry) { /* Covers are only downloaded once their book comes near the viewport */
+             const { book, chunk, slot } = entry; if (entry.coverRequested || !book.image) return; entry.coverRequested = true;
+             imageLoader.load( coverSrc(book), (image) => { if (chunks.includes(chunk)) drawCover(chunk.coverAtlas, slot, image); }, undefined, (err) => { console.error(`Err texture ${book.title}:`, err); } );
+         }
+        function writeInstance(entry) {
+             instancePosition.set(entry.x, bookY(entry.index), 0); instanceMatrix.compose(instancePosition, instanceQuaternion, instanceScale);
+             entry.chunk.mesh.setMatrixAt(entry.slot, instanceMatrix); entry.chunk.mesh.instanceMatrix.needsUpdate = true;
+         }
+        function uploadDirtyAtlases() { /* At most one upload per atlas per frame, however many covers loaded */
+             chunks.forEach((chunk) => { [chunk.spineAtlas, chunk.coverAtlas].forEach((atlas) => { if (atlas.dirty) { atlas.texture.needsUpdate = true; atlas.dirty = false; } }); });
+         }
+        function disposeChunks() {
+             gsap.killTweensOf(instancedBooks.filter(Boolean)); chunks.forEach((chunk) => { chunk.spineAtlas.texture.dispose(); chunk.coverAtlas.texture.dispose(); chunk.mesh.material.slice(1).forEach((material) => material.dispose()); chunk.mesh.dispose(); });
+             chunks.length = 0; instancedBooks.length = 0; residentAtlases.entries.clear();
+         }
+
+        // --- Viewport Window: only books near the camera get meshes and covers ---
+        function windowRange() {
+             const step = BOOK_DEFAULTS.HEIGHT + BOOK_SPACING; const reach = Math.tan(THREE.MathUtils.degToRad(CAMERA_FOV / 2)) * camera.position.length() + BOOK_DEFAULTS.HEIGHT;
+             const top = stackStartY(layoutCount) + booksGroup.position.y; // Book i sits at top - i * step in world space; the camera looks at y = 0
+             let first = Math.floor((top - reach) / step) - WINDOW_MARGIN; let last = Math.ceil((top + reach) / step) + WINDOW_MARGIN;
+             const moving = targetGroupY - booksGroup.position.y; if (moving > 0.01) { last += WINDOW_PREFETCH; } else if (moving < -0.01) { first -= WINDOW_PREFETCH; } // Scrolling down raises the stack
+             return [Math.max(0, first), Math.min(layoutCount - 1, last)];
+         }
+        function inWindow(index) { return !WINDOWED || (index >= windowFirst && index <= windowLast); }
+        function updateWindow(force) {
+             if (!camera) return; const [first, last] = WINDOWED ? windowRange() : [0, layoutCount - 1];
+             if (!force && first === windowFirst && last === windowLast) return; windowFirst = first; windowLast = last;
+             if (RENDER_MODE === 'instanced') {
+                 for (let i = first; i <= last; i++) { if (instancedBooks[i]) requestCover(instancedBooks[i]); }
+                 chunks.forEach((chunk, c) => { chunk.mesh.visible = c * CHUNK_SIZE <= last && (c + 1) * CHUNK_SIZE - 1 >= first; if (chunk.mesh.visible) residentAtlases.set(c, chunk); });
+             } else {
+                 bookMeshes.forEach((mesh, index) => { if (!inWindow(index)) disposeBookMesh(index); });
+                 for (let i = first; i <= Math.min(last, bookData.length - 1); i++) { if (!bookMeshes.has(i)) { const bookMesh = createBookMesh(bookData[i]); bookMesh.userData.index = i; bookMesh.position.set(0, bookY(i), 0); booksGroup.add(bookMesh); bookMeshes.set(i, bookMesh); } }
+             }
+         }
+        function disposeBookMesh(index) { /* Cover textures belong to coverTextures; everything else is this book's own */
+             const mesh = bookMeshes.get(index); bookMeshes.delete(index); gsap.killTweensOf(mesh.position); booksGroup.remove(mesh); mesh.geometry.dispose();
+             new Set(mesh.material).forEach((material) => { if (material.map && !material.userData.pooledMap) material.map.dispose(); material.dispose(); });
+         }
+
 
         // --- Init & Event Handlers ---
         function main() { setupEventHandlers(); showInputForm(); }
         function setupEventHandlers() { shelfForm.addEventListener('submit', handleUrlSubmit); window.addEventListener('resize', onWindowResize); window.addEventListener('scroll', onWindowScroll); }
 
         // --- Handle Form Submit ---
-        async function handleUrlSubmit(event) { /* ... (Identical - includes loader start/stop) ... */
+        async function handleUrlSubmit(event) { /* Starts a scrape job and streams its books into the scene */
              event.preventDefault(); const shelfUrl = shelfUrlInput.value.trim(); if (!shelfUrl || !shelfUrl.includes('goodreads.com/review/list/')) { alert('Error: Invalid URL.'); return; } console.log("Shelf URL:", shelfUrl); inputContainer.style.display = 'none'; loadingMessage.style.display = 'block';
-             statusText.textContent = "Fetching data..."; progressBarFill.style.width = '0%'; progressBarFill.textContent = '0%'; if (progressIntervalId) clearInterval(progressIntervalId); progressIntervalId = setInterval(updateProgress, 1000);
-             try { const apiUrl = `/get_books?url=${encodeURIComponent(shelfUrl)}`; console.log("Fetching from:", apiUrl); const response = await fetch(apiUrl); let errorMsg = `HTTP error ${response.status}`; if (!response.ok) { try { const d=await response.json(); errorMsg = d.error||errorMsg; } catch (e) {} throw new Error(errorMsg); } const data = await response.json(); console.log("Received data:", data);
-                if (progressIntervalId) clearInterval(progressIntervalId); progressIntervalId = null; if (data.error && (!data.books || data.books.length === 0)) { throw new Error(data.error); } bookData = data.books || []; statusText.textContent = `${bookData.length} books found. Building scene...`; progressBarFill.style.width = '100%'; progressBarFill.textContent = '100%';
-                if (!scene) { initThreeJS(); } populateScene(); // Triggers animations
-             } catch (error) { console.error("Fetch error:", error); alert(`Error: ${error.message}`); statusText.textContent = `Error: ${error.message}`; if (progressIntervalId) clearInterval(progressIntervalId); progressIntervalId = null; loadingMessage.style.display = 'block'; }
+             statusText.textContent = "Fetching data..."; progressBarFill.style.width = '0%'; progressBarFill.textContent = '0%';
+             try { const jobResponse = await fetch('/jobs', { method: 'POST', body: new URLSearchParams({ url: shelfUrl }) }); if (!jobResponse.ok) { let errorMsg = `HTTP error ${jobResponse.status}`; try { const d=await jobResponse.json(); errorMsg = d.error||errorMsg; } catch (e) {} throw new Error(errorMsg); } const job = await jobResponse.json(); console.log("Scrape job:", job.job_id);
+                streamJob(job);
+             } catch (error) { showLoadError(error.message); }
         }
-
-        // --- updateProgress Function ---
-        async function updateProgress() { /* ... (Identical - polls /progress) ... */
-             try { const response = await fetch('/progress'); if (!response.ok) { console.warn("Progress check failed:", response.status); return; } const data = await response.json(); const percent = data.progress || 0; if(progressBarFill){ progressBarFill.style.width = percent + '%'; progressBarFill.textContent = percent + '%'; } if(statusText){ if (!data.complete && !data.error) { statusText.textContent = `Processing... (${data.books_processed}/${data.total_books})`; } } if (data.complete || data.error) { console.log("Progress poll end."); if (progressIntervalId) clearInterval(progressIntervalId); progressIntervalId = null; if(progressBarFill){ progressBarFill.style.width = '100%'; progressBarFill.textContent = '100%';} if(statusText && data.error){ statusText.textContent = `Error: ${data.error}`; } else if(statusText && data.complete) { /* Let handleUrlSubmit show final */ } } } catch (error) { console.warn("Error fetching progress:", error); }
+        function showLoadError(message) { console.error("Fetch error:", message); alert(`Error: ${message}`); statusText.textContent = `Error: ${message}`; loadingMessage.style.display = 'block'; }
+
+        // --- Stream Books From a Job (Server-Sent Events) ---
+        function streamJob(job) {
+             if (eventSource) eventSource.close(); bookData = []; resetScene(0);
+             eventSource = new EventSource(job.stream_url); // Reconnects resume after the last book via Last-Event-ID
+             eventSource.addEventListener('book', (event) => {
+                 const data = JSON.parse(event.data); if (data.index < bookData.length) return; // Already placed
+                 bookData.push(data.book); const expected = Math.max(data.total_books || 0, bookData.length); const percent = Math.min(100, Math.round(bookData.length / expected * 100));
+                 progressBarFill.style.width = percent + '%'; progressBarFill.textContent = percent + '%'; statusText.textContent = `Loading... (${bookData.length}/${expected})`;
+                 if (!scene) { initThreeJS(); } if (expected !== layoutCount) { relayoutScene(expected); }
+                 addBookToScene(data.book, data.index); loadingMessage.style.display = 'none';
+             });
+             eventSource.addEventListener('done', (event) => {
+                 const data = JSON.parse(event.data); eventSource.close(); eventSource = null;
+                 if (!bookData.length) { showLoadError(data.error || 'No books found'); return; } if (data.error) { console.warn("Scrape finished with:", data.error); }
+                 if (bookData.length !== layoutCount) { relayoutScene(bookData.length); } console.log(`${bookData.length} books streamed.`);
+             });
+             eventSource.onerror = () => { console.warn("Book stream interrupted, reconnecting..."); };
         }
 
         // --- Three.js Scene Initialization ---
@@ -248,22 +514,25 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
             camera.lookAt(0, 0, 0); renderer = new THREE.WebGLRenderer({ antialias: true }); renderer.setSize(window.innerWidth, window.innerHeight); renderer.setPixelRatio(window.devicePixelRatio); canvasContainer.appendChild(renderer.domElement); const ambientLight = new THREE.AmbientLight(0xffffff, 0.7); scene.add(ambientLight); const keyLight = new THREE.DirectionalLight(0xffffff, 0.8); keyLight.position.set(-8, 10, 8); scene.add(keyLight); const fillLight = new THREE.DirectionalLight(0xffffff, 0.3); fillLight.position.set(8, 2, 6); scene.add(fillLight); scene.add(booksGroup); window.addEventListener('resize', onWindowResize); if (!animationFrameId) { animate(); console.log("Animation loop started."); }
         }
 
-        // --- Populate Scene with Books ---
-        function populateScene() { /* Uses constants from user's code */
-             while(booksGroup.children.length > 0){ booksGroup.remove(booksGroup.children[0]); } console.log(`Creating ${bookData.length} book meshes...`);
-             const totalStackHeight = bookData.length * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING) - BOOK_SPACING; // Uses user's size/spacing
-             const startY = totalStackHeight / 2 - BOOK_DEFAULTS.HEIGHT / 2;
-             const initialGroupY = -startY;
-             bookData.forEach((book, index) => {
-                 const bookMesh = createBookMesh(book); // Creates larger book
-                 bookMesh.position.y = startY - index * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING);
-                 const startX = (index % 2 === 0) ? -ANIM_START_X : ANIM_START_X; bookMesh.position.x = startX; booksGroup.add(bookMesh);
-                 gsap.to(bookMesh.position, { x: 0, duration: ANIM_DURATION, delay: 0.05 + index * ANIM_STAGGER, ease: ANIM_EASE });
-             });
-             console.log("Finished adding meshes and starting animations."); loadingMessage.style.display = 'none';
-             document.body.style.height = `${totalStackHeight * 50}px`;
-             targetGroupY = initialGroupY; booksGroup.position.y = initialGroupY;
-             onWindowScroll(); // Set initial scroll position
+        // --- Populate Scene with Books (Incrementally) ---
+        function stackStartY(count) { const totalStackHeight = count * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING) - BOOK_SPACING; return totalStackHeight / 2 - BOOK_DEFAULTS.HEIGHT / 2; }
+        function resetScene(expectedCount) {
+             [...bookMeshes.keys()].forEach(disposeBookMesh); while(booksGroup.children.length > 0){ booksGroup.remove(booksGroup.children[0]); } disposeChunks(); coverTextures.clear(); windowFirst = 0; windowLast = -1; nextAnimAt = 0;
+             relayoutScene(expectedCount); targetGroupY = -stackStartY(expectedCount); booksGroup.position.y = targetGroupY;
+         }
+        function relayoutScene(count) { /* Stack positions depend on the book count, which may only be estimated while streaming */
+             layoutCount = count;
+             if (RENDER_MODE === 'instanced') { instancedBooks.forEach((entry) => { if (entry) writeInstance(entry); }); } else { bookMeshes.forEach((mesh, index) => { mesh.position.y = bookY(index); }); }
+             const totalStackHeight = count * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING) - BOOK_SPACING; document.body.style.height = `${Math.max(0, totalStackHeight) * 50}px`;
+             onWindowScroll();
+         }
+        function bookY(index) { return stackStartY(layoutCount) - index * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING); }
+        function addBookToScene(book, index) { /* Uses constants from user's code */
+             const startX = (index % 2 === 0) ? -ANIM_START_X : ANIM_START_X; let target; let onUpdate;
+             if (RENDER_MODE === 'instanced') { const entry = addInstancedBook(book, index); entry.x = startX; writeInstance(entry); target = entry; onUpdate = () => writeInstance(entry); updateWindow(true); }
+             else { updateWindow(true); const bookMesh = bookMeshes.get(index); if (!bookMesh) return; bookMesh.position.x = startX; target = bookMesh.position; } // Books outside the window get their mesh when scrolled to
+             const now = performance.now() / 1000; nextAnimAt = Math.max(nextAnimAt, now + 0.05); // Books arriving together still stagger
+             gsap.to(target, { x: 0, duration: ANIM_DURATION, delay: nextAnimAt - now, ease: ANIM_EASE, onUpdate }); nextAnimAt += ANIM_STAGGER;
          }
 
         // --- Create Single Book Mesh (MODIFIED FOR SPINE TEXTURE) ---
@@ -278,7 +547,8 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
                  color: 0xffffff, // Base color white
                  roughness: 0.8, metalness: 0.1 });
              const coverMaterial = new THREE.MeshStandardMaterial({ color: 0xffffff, roughness: 0.8, metalness: 0.1 });
-             if (book.image) { textureLoader.load( book.image, (texture) => { texture.colorSpace = THREE.SRGBColorSpace; const imgAspect = texture.image.naturalWidth / texture.image.naturalHeight; const geomAspect = BOOK_DEFAULTS.WIDTH / BOOK_DEFAULTS.HEIGHT; texture.repeat.set(1, geomAspect / imgAspect); texture.offset.set(0, (1 - texture.repeat.y) / 2); coverMaterial.map = texture; coverMaterial.needsUpdate = true; }, undefined, (err) => { console.error(`Err texture ${book.title}:`, err); } ); }
+             coverMaterial.userData.pooledMap = true; const cached = book.image && coverTextures.get(coverSrc(book)); // Scrolling back reuses a pooled cover instead of downloading it again
+             if (cached) { coverMaterial.map = cached; } else if (book.image) { textureLoader.load( coverSrc(book), (texture) => { texture.colorSpace = THREE.SRGBColorSpace; const imgAspect = texture.image.naturalWidth / texture.image.naturalHeight; const geomAspect = BOOK_DEFAULTS.WIDTH / BOOK_DEFAULTS.HEIGHT; texture.repeat.set(1, geomAspect / imgAspect); texture.offset.set(0, (1 - texture.repeat.y) / 2); coverTextures.set(coverSrc(book), texture); coverMaterial.map = texture; coverMaterial.needsUpdate = true; }, undefined, (err) => { console.error(`Err texture ${book.title}:`, err); } ); }
              const materials = [ pageMaterial, spineMaterial, pageMaterial, pageMaterial, coverMaterial, pageMaterial ]; // R, L(-X/Spine), T, B, F(+Z/Cover), Bk
              const mesh = new THREE.Mesh(geometry, materials);
              mesh.rotation.order = 'YXZ'; mesh.rotation.x = TARGET_ROTATION_X; mesh.rotation.y = TARGET_ROTATION_Y;
@@ -287,12 +557,12 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
 
         // --- Handle Scrolling (Uses updated constants) ---
         function onWindowScroll() {
-             const totalTravelDistance = Math.max(0, bookData.length - 1) * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING); currentScrollY = window.scrollY; const maxScroll = document.documentElement.scrollHeight - window.innerHeight; const scrollRatio = maxScroll > 0 ? currentScrollY / maxScroll : 0; const totalStackHeight = bookData.length * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING) - BOOK_SPACING; const startY = totalStackHeight / 2 - BOOK_DEFAULTS.HEIGHT / 2; const initialGroupY = -startY;
+             const totalTravelDistance = Math.max(0, layoutCount - 1) * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING); currentScrollY = window.scrollY; const maxScroll = document.documentElement.scrollHeight - window.innerHeight; const scrollRatio = maxScroll > 0 ? currentScrollY / maxScroll : 0; const totalStackHeight = layoutCount * (BOOK_DEFAULTS.HEIGHT + BOOK_SPACING) - BOOK_SPACING; const startY = totalStackHeight / 2 - BOOK_DEFAULTS.HEIGHT / 2; const initialGroupY = -startY;
              targetGroupY = initialGroupY + (scrollRatio * totalTravelDistance);
          }
         // --- Render Loop ---
         function animate() {
-             animationFrameId = requestAnimationFrame(animate); booksGroup.position.y += (targetGroupY - booksGroup.position.y) * 0.1; renderer.render(scene, camera);
+             animationFrameId = requestAnimationFrame(animate); booksGroup.position.y += (targetGroupY - booksGroup.position.y) * 0.1; updateWindow(false); uploadDirtyAtlases(); renderer.render(scene, camera);
          }
         // --- Resize Handler ---
         function onWindowResize() {
@@ -306,31 +576,114 @@ THREE_TEMPLATE = '''<!DOCTYPE html>
 </body>
 </html>'''
 
-# --- Flask Routes (Including /progress) ---
+# --- Flask Routes (Scrape Jobs) ---
+jobs = JobManager(get_books_cached)
+
+def books_response(books_data, progress):
+    # (payload, status) for a finished scrape
+    error_message = progress.get("error")
+    if error_message:
+        status_code = 500 if ("Failed page 1" in error_message or "fetch" in error_message) and not books_data else 200
+        if progress.get("failed_pages"): # Partial result: every page's status, and when the missing ones are retried
+            return {"error": error_message,"books": books_data or [],"total_found": len(books_data or []),"pages": progress["pages"],"failed_pages": progress["failed_pages"],"retry": progress.get("retry")}, status_code
+        return {"error": error_message,"books": books_data or []}, status_code
+    elif not books_data: return {"error": "No books found"}, 404
+    else: return {"books": books_data,"total_found": len(books_data)}, 200
+
+def job_links(job):
+    return {"job_id": job.id, "status": job.status, "progress_url": url_for("get_progress", job_id=job.id), "result_url": url_for("get_job_result", job_id=job.id), "stream_url": url_for("stream_job", job_id=job.id),
+            **({"profile": job.profile_path + ".txt"} if job.profile_path else {})}
+
+def wants_profile():
+    # profile=1 asks for a dump under PROFILE_DIR; ignored unless PROFILE_DIR is set
+    return (request.values.get("profile") or (request.get_json(silent=True) or {}).get("profile") or "") in ("1", "true", True)
+
 @app.route("/")
 def index():
-    global progress_data; progress_data = {"total_books":0,"books_processed":0,"complete":False,"error":None}
     return render_template_string(THREE_TEMPLATE)
 
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    url = (request.form.get("url") or (request.get_json(silent=True) or {}).get("url") or request.args.get("url") or "").strip()
+    if not url: return jsonify({"error": "Missing URL parameter"}), 400
+    job = jobs.submit(url, profile=wants_profile()) # Joins an in-flight job for the same shelf
+    return jsonify(job_links(job)), 202
+
+@app.route("/progress/<job_id>")
+def get_progress(job_id):
+    job = jobs.get(job_id)
+    if not job: return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.progress_snapshot())
+
+@app.route("/jobs/<job_id>/result")
+def get_job_result(job_id):
+    job = jobs.get(job_id)
+    if not job: return jsonify({"error": "Unknown job"}), 404
+    if not job.done.is_set(): return jsonify(job.progress_snapshot()), 202
+    payload, status_code = books_response(job.books, job.progress)
+    return with_cache_headers(jsonify(payload), job.progress), status_code
+
+@app.route("/jobs/<job_id>/stream")
+def stream_job(job_id):
+    # Server-Sent Events: one "book" event per finished book (shelf order), then a "done" event with the result summary
+    job = jobs.get(job_id)
+    if not job: return jsonify({"error": "Unknown job"}), 404
+    last_id = request.headers.get("Last-Event-ID", "") # EventSource resends it when reconnecting
+    start = int(last_id) + 1 if last_id.isdigit() else 0
+    def events():
+        for index, book in job.iter_books(start):
+            if book is None: yield ": keep-alive\n\n"; continue
+            data = {"index": index, "total_books": job.progress.get("total_books", 0), "book": book}
+            yield f"id: {index}\nevent: book\ndata: {json.dumps(data)}\n\n"
+        payload, status_code = books_response(job.books, job.progress); payload.pop("books", None)
+        yield f"event: done\ndata: {json.dumps({**payload, 'status': status_code, 'total_found': len(job.books or [])})}\n\n"
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Flask Routes (Cover Proxy) ---
+COVER_MAX_AGE = 30 * 24 * 3600 # Ids are hashes of the cover URL, so a response never goes stale
+
+@app.route("/cover/<cover_id>")
+def get_cover(cover_id):
+    # Stored cover, downloaded once; ?size=thumb|texture serves a resized, cached variant
+    size = request.args.get("size")
+    if not re.fullmatch(r"[0-9a-f]{20}", cover_id): return jsonify({"error": "Unknown cover"}), 404
+    if size and size not in COVER_SIZES: return jsonify({"error": f"Unknown size (use {', '.join(COVER_SIZES)})"}), 400
+    headers = {"Cache-Control": f"public, max-age={COVER_MAX_AGE}, immutable", "ETag": f'"{cover_id}-{size or "original"}"'}
+    if request.headers.get("If-None-Match") == headers["ETag"]: return Response(status=304, headers=headers)
+    try: found = get_default_store().variant(cover_id, size)
+    except requests.exceptions.RequestException as e: return jsonify({"error": f"Cover fetch failed: {e}"}), 502
+    if not found: return jsonify({"error": "Unknown cover"}), 404
+    data, mimetype = found
+    return Response(data, mimetype=mimetype, headers=headers)
+
 @app.route("/get_books")
 def get_books_api():
+    # Blocking form of POST /jobs + result, kept for API clients
     url = request.args.get("url", "").strip()
     if not url: return jsonify({"error": "Missing URL parameter"}), 400
-    # --- Ensure scraper returns author/publisher ---
-    books_data = get_books_from_shelf(url)
-    error_message = progress_data.get("error")
-    if error_message:
-        status_code = 500 if ("Failed page 1" in error_message or "fetch" in error_message) and not books_data else 200
-        return jsonify({"error": error_message,"books": books_data or []}), status_code
-    elif not books_data: return jsonify({"error": "No books found"}), 404
-    else: return jsonify({"books": books_data,"total_found": len(books_data)})
-
-@app.route("/progress")
-def get_progress():
-    total = progress_data.get("total_books", 0)
-    processed = progress_data.get("books_processed", 0)
-    percent = min(100, int((processed / total) * 100)) if total > 0 else 0
-    return jsonify({ "progress": percent, "books_processed": processed, "total_books": total, "complete": progress_data.get("complete", False), "error": progress_data.get("error") })
+    job = jobs.submit(url, profile=wants_profile()); job.wait()
+    payload, status_code = books_response(job.books, job.progress)
+    response = with_cache_headers(jsonify(payload), job.progress)
+    if job.profile_path: response.headers["X-Profile"] = job.profile_path + ".txt"
+    return response, status_code
+
+# --- Flask Routes (Metrics) ---
+def _runtime_metrics():
+    # Collected on each /metrics render: HTTP client totals, shelf cache lookups, job counts by status and spine cache size, read from the components that keep them
+    http = get_client().stats(); spine_cache = get_default_cache()
+    samples = [("http_requests_total", "counter", {}, http["requests"]), ("http_retries_total", "counter", {}, http["retries"]),
+               ("http_failures_total", "counter", {}, http["failures"]), ("http_bytes_total", "counter", {}, http["bytes"]),
+               ("http_seconds_total", "counter", {}, http["seconds"])]
+    samples += [("shelf_cache_lookups_total", "counter", {"result": status.lower()}, count) for status, count in shelf_results.stats.items()]
+    samples += [("jobs", "gauge", {"status": status}, count) for status, count in jobs.status_counts().items()]
+    if spine_cache: samples.append(("spine_cache_entries", "gauge", {}, spine_cache.count()))
+    return samples
+
+metrics.add_collector(_runtime_metrics)
+
+@app.route("/metrics")
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 # --- Main Execution ---
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+# batch_scrape.py - Refresh many Goodreads shelves in one run
+#
+# Usage: python3 batch_scrape.py SHELVES.txt [--workers N] [--rate R] [--resume] [--full] [--jsonl PATH] [--parquet DIR]
+#
+# SHELVES.txt holds one shelf URL or user id (e.g. 33279125-prakhar-gupta) per line; blank lines
+# and "#" comments are skipped. Shelves are synced incrementally (shelf_sync, namespace "batch")
+# on a thread pool that shares one pooled HTTP client and one rate limiter per host. Each finished
+# shelf's result is appended to a checkpoint file, so --resume after a crash skips shelves that
+# already succeeded.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import shelf_export
+import shelf_sync
+from http_client import get_client
+from shelf_scraper import iter_shelf_pages, host_limiter, shelf_url, PageFetchError
+
+# --- Settings ---
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8")) # Shelves scraped at the same time
+BATCH_PAGE_WORKERS = int(os.environ.get("BATCH_PAGE_WORKERS", "2")) # Pages fetched at once within each shelf
+NAMESPACE = "batch"
+
+
+def read_shelves(path):
+    """Shelf URLs from `path`, in file order, without duplicates."""
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line and shelf_url(line) not in urls: urls.append(shelf_url(line))
+    return urls
+
+
+def load_checkpoint(path):
+    """{url: result} for shelves a previous run finished successfully."""
+    done = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try: result = json.loads(line)
+                except ValueError: continue # A crash can cut the last line short
+                if result.get("status") == "done": done[result["url"]] = result
+    except OSError: pass
+    return done
+
+
+def scrape_shelf(url, full=False, rate=None, export_opts=None):
+    """Sync one shelf; returns its result dict (status "done" or "failed")."""
+    start = time.perf_counter(); result = {"url": url, "status": "failed", "new": 0, "total": 0, "pages": 0, "error": None}
+    incremental = not full and shelf_sync.supports_incremental(url)
+    stored_books = shelf_sync.load_books(url, NAMESPACE) if incremental else []
+    known_ids = {b["review_id"] for b in stored_books if b.get("review_id")}
+    new_books = []
+    try:
+        with shelf_export.open_export(url, **(export_opts or {})) as export:
+            for page in iter_shelf_pages(url, known_ids=known_ids, stored_count=len(stored_books), page_workers=BATCH_PAGE_WORKERS, limiter=host_limiter(url, rate)):
+                result["pages"] += 1
+                for book in page.books:
+                    if not (book["title"] and book["author"]): continue
+                    new_books.append({key: book[key] for key in ("review_id", "title", "author", "publisher", "image", "rating", "review")}); export.add(book)
+        all_books = shelf_sync.merge_books(new_books, stored_books)
+        shelf_sync.save_books(url, NAMESPACE, all_books)
+        result.update(status="done", new=len(new_books), total=len(all_books))
+    except PageFetchError as e: result["error"] = str(e)
+    except Exception as e: result["error"] = f"{type(e).__name__}: {e}" # One bad shelf must not stop the batch
+    result["seconds"] = round(time.perf_counter() - start, 3); result["finished_at"] = time.time()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape many Goodreads shelves on a shared worker pool")
+    parser.add_argument("shelves", help="File with one shelf URL or user id per line")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help=f"Shelves scraped at once (default {BATCH_WORKERS})")
+    parser.add_argument("--rate", type=float, help="Max page requests per second per host, shared by all workers (default PAGE_RATE_LIMIT)")
+    parser.add_argument("--checkpoint", help="Results/checkpoint file (default SHELVES.checkpoint.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="Skip shelves the checkpoint already lists as done")
+    parser.add_argument("--full", action="store_true", help="Re-walk every page instead of syncing incrementally")
+    parser.add_argument("--jsonl", help="Also append scraped records to this JSONL export")
+    parser.add_argument("--parquet", help="Also write scraped records to this Parquet dataset directory")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or os.path.splitext(args.shelves)[0] + ".checkpoint.jsonl"
+    urls = read_shelves(args.shelves)
+    finished = load_checkpoint(checkpoint_path) if args.resume else {}
+    todo = [url for url in urls if url not in finished]
+    if not args.resume and os.path.exists(checkpoint_path): os.remove(checkpoint_path) # A fresh run starts a fresh checkpoint
+    print(f"📚 {len(urls)} shelves, {len(urls) - len(todo)} already done, {len(todo)} to scrape with {args.workers} workers")
+
+    export_opts = {"jsonl": args.jsonl, "parquet": args.parquet}
+    results = []; start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="shelf") as pool:
+        futures = [pool.submit(scrape_shelf, url, args.full, args.rate, export_opts) for url in todo]
+        for future in as_completed(futures):
+            result = future.result(); results.append(result)
+            with open(checkpoint_path, "a", encoding="utf-8") as f: f.write(json.dumps(result) + "\n")
+            if result["status"] == "done": print(f"✅ {result['url']}: {result['new']} new, {result['total']} total, {result['pages']} pages in {result['seconds']:.1f}s")
+            else: print(f"❌ {result['url']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+
+    done = [r for r in results if r["status"] == "done"]; failed = [r for r in results if r["status"] != "done"]
+    new_books = sum(r["new"] for r in done); pages = sum(r["pages"] for r in results)
+    print(f"\n📊 {len(done)} done, {len(failed)} failed, {len(urls) - len(todo)} skipped in {elapsed:.1f}s")
+    if elapsed > 0 and results: print(f"   {len(results) / elapsed * 60:.1f} shelves/min, {pages / elapsed:.1f} pages/s, {new_books} new books")
+    for r in failed: print(f"   ❌ {r['url']}: {r['error']}")
+    print(f"🌐 HTTP: {get_client().summary()}")
+    print(f"📝 Results in {checkpoint_path}" + (" (rerun with --resume to retry failures)" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench_edge_color.py - Compare fast (reduced-size) and full cover decodes for get_edge_color, and per-cover vs batch colors
+#
+# Usage: python3 bench_edge_color.py [--covers DIR] [--limit N] [--repeat N] [--processes N] [--json OUT]
+#
+# Without --covers the cover URLs referenced by the bundled bookshelf_*.html pages are
+# downloaded once (high-res, like app.get_books_from_shelf) into bench_covers/ and reused.
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import requests
+
+from spine_colors import edge_color_from_bytes, edge_colors_from_bytes
+from http_client import get_client
+
+COVER_DIR = "bench_covers"
+FIXTURE_PAGES = sorted(glob.glob("bookshelf_*.html")) + ["2040005-wil-wheaton.html", "20089951-mahasweta-md.html"]
+
+
+def fixture_cover_urls(limit):
+    urls = []
+    for path in FIXTURE_PAGES:
+        if not os.path.exists(path): continue
+        with open(path, encoding="utf-8") as f:
+            for src in re.findall(r'<img src="([^"]+)"', f.read()):
+                high_res = re.sub(r'\._S[XY]?\d+_?\.', '.', src)
+                if "nophoto" not in high_res and high_res not in urls: urls.append(high_res)
+    return urls[:limit]
+
+
+def download_covers(urls, cover_dir):
+    os.makedirs(cover_dir, exist_ok=True); paths = []
+    for url in urls:
+        path = os.path.join(cover_dir, url.rsplit("/", 1)[-1])
+        if not os.path.exists(path):
+            try: response = get_client().get(url, timeout=10); response.raise_for_status()
+            except requests.exceptions.RequestException as e: print(f"Skip {url}: {e}"); continue
+            with open(path, "wb") as f: f.write(response.content)
+        paths.append(path)
+    return paths
+
+
+def channel_delta(a, b):
+    return max(abs(int(a[i:i + 2], 16) - int(b[i:i + 2], 16)) for i in (1, 3, 5))
+
+
+def time_mode(blobs, mode, repeat):
+    colors = []; start = time.perf_counter()
+    for _ in range(repeat): colors = [edge_color_from_bytes(blob, mode=mode) for blob in blobs]
+    return colors, (time.perf_counter() - start) / repeat
+
+
+def time_batch(blobs, mode, repeat, processes):
+    edge_colors_from_bytes(blobs, mode=mode, processes=processes) # Starts the worker processes outside the timing
+    colors = []; start = time.perf_counter()
+    for _ in range(repeat): colors = edge_colors_from_bytes(blobs, mode=mode, processes=processes)
+    return colors, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast vs full cover decoding for spine colors")
+    parser.add_argument("--covers", help="Directory of cover images to use instead of the fixture covers")
+    parser.add_argument("--limit", type=int, default=100, help="Max fixture covers to download (default 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing passes per mode (default 3)")
+    parser.add_argument("--processes", type=int, help="Worker processes for the batch pass (default SPINE_BATCH_PROCESSES)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    if args.covers: paths = sorted(p for p in glob.glob(os.path.join(args.covers, "*")) if os.path.isfile(p))
+    else: paths = download_covers(fixture_cover_urls(args.limit), COVER_DIR)
+    if not paths: print("❌ No cover images to benchmark."); sys.exit(1)
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f: blobs.append(f.read())
+
+    full_colors, full_time = time_mode(blobs, "full", args.repeat)
+    fast_colors, fast_time = time_mode(blobs, "fast", args.repeat)
+    batch_colors, batch_time = time_batch(blobs, "fast", args.repeat, args.processes)
+    deltas = [channel_delta(a, b) for a, b in zip(full_colors, fast_colors)]
+    batch_mismatches = sum(a != b for a, b in zip(fast_colors, batch_colors))
+
+    results = {
+        "covers": len(blobs),
+        "bytes": sum(len(b) for b in blobs),
+        "full_seconds": round(full_time, 4),
+        "fast_seconds": round(fast_time, 4),
+        "speedup": round(full_time / fast_time, 2) if fast_time else None,
+        "batch_seconds": round(batch_time, 4),
+        "batch_speedup": round(fast_time / batch_time, 2) if batch_time else None,
+        "batch_mismatches": batch_mismatches,
+        "max_channel_delta": max(deltas),
+        "mean_channel_delta": round(sum(deltas) / len(deltas), 2),
+        "per_cover": [
+            {"file": os.path.basename(p), "full": a, "fast": b, "batch": c, "delta": d}
+            for p, a, b, c, d in zip(paths, full_colors, fast_colors, batch_colors, deltas)],
+    }
+    print(f"📊 {results['covers']} covers ({results['bytes'] / 1e6:.1f} MB)")
+    print(f"   full decode: {full_time * 1000:.1f} ms/pass")
+    print(f"   fast decode: {fast_time * 1000:.1f} ms/pass ({results['speedup']}x)")
+    print(f"   fast batch:  {batch_time * 1000:.1f} ms/pass ({results['batch_speedup']}x vs fast, {batch_mismatches} colors differ)")
+    print(f"   color delta: max {results['max_channel_delta']}, mean {results['mean_channel_delta']} (0-255 per channel)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# bench_parsers.py - Offline shelf-parser benchmark over the bundled bookshelf fixtures
+#
+# Usage: python3 bench_parsers.py [--repeat N] [--json OUT] [--baseline OLD.json] [--tolerance 0.15]
+#
+# Every installed shelf_scraper backend (plus "legacy", the per-row BeautifulSoup/html.parser
+# loop that app.py and generate_html.py used before shelf_scraper) parses the fixture pages
+# from shelf_fixtures in its own fresh process. Reports rows/sec, peak memory and time spent in
+# each selector; with --baseline, exits 1 if any backend's rows/sec dropped by more than --tolerance.
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+
+import shelf_fixtures
+import shelf_scraper
+
+
+def legacy_parse(html):
+    # Row extraction as it was copy-pasted into app.py/generate_html.py before shelf_scraper
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser"); books = []
+    for row in soup.select('tr[id^="review_"]'):
+        title_tag = row.select_one('td.field.title .value a'); author_tag = row.select_one('td.field.author .value a')
+        image_tag = row.select_one('td.field.cover img'); publisher_tag = row.select_one('td.field.publisher .value')
+        rating_tag = row.select_one('td.field.rating .value span.staticStars'); review_tag = row.select_one('td.field.review .value span.greyText')
+        books.append({
+            "title": title_tag.text.strip() if title_tag else None,
+            "author": author_tag.text.strip() if author_tag else None,
+            "publisher": publisher_tag.text.strip() if publisher_tag else None,
+            "image": image_tag["src"] if image_tag else None,
+            "rating": rating_tag["title"] if rating_tag and rating_tag.has_attr("title") else None,
+            "review": review_tag.text.strip() if review_tag else None,
+        })
+    return books
+
+
+def load_pages():
+    pages = []
+    for path in shelf_fixtures.FIXTURE_FILES: pages.extend(shelf_fixtures.fixture_pages(path))
+    return pages
+
+
+def selector_times(parser, pages):
+    # Seconds spent building documents and in each precompiled selector, over all pages
+    b = parser.backend; times = dict.fromkeys(["document", "rows", "count", *shelf_scraper.FIELD_SELECTORS], 0.0)
+    for html in pages:
+        start = time.perf_counter(); doc = b.document(html); times["document"] += time.perf_counter() - start
+        start = time.perf_counter(); parser.total_books(doc); times["count"] += time.perf_counter() - start
+        start = time.perf_counter(); rows = b.select(doc, parser.rows); times["rows"] += time.perf_counter() - start
+        for field, selector in parser.fields.items():
+            start = time.perf_counter()
+            for row in rows: b.select_one(row, selector)
+            times[field] += time.perf_counter() - start
+    return {name: round(seconds, 5) for name, seconds in times.items()}
+
+
+def run_backend(name, repeat, results):
+    # Runs in a fresh process so peak RSS belongs to this backend alone
+    pages = load_pages()
+    parse = legacy_parse if name == "legacy" else (lambda html, p=shelf_scraper.get_parser(name): p.parse(html)[1])
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start(); rows = sum(len(parse(html)) for html in pages); _, py_peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages: parse(html)
+        elapsed = time.perf_counter() - start; best = elapsed if best is None else min(best, elapsed)
+    results[name] = {
+        "pages": len(pages),
+        "rows": rows,
+        "seconds": round(best, 5),
+        "rows_per_sec": round(rows / best, 1),
+        "peak_python_kb": round(py_peak / 1024, 1),
+        "peak_rss_delta_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        "selector_seconds": None if name == "legacy" else selector_times(shelf_scraper.get_parser(name), pages),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get("backends", {}).get(name)
+        if old and result["rows_per_sec"] < old["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {old['rows_per_sec']} -> {result['rows_per_sec']} rows/sec")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shelf row parsing over the bundled fixtures")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per backend; the best is kept (default 3)")
+    parser.add_argument("--backend", action="append", help="Only run this backend (repeatable)")
+    parser.add_argument("--json", default="bench_parsers.json", help="Results file (default bench_parsers.json)")
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed rows/sec drop vs baseline (default 0.15)")
+    args = parser.parse_args()
+
+    backends = args.backend or ["legacy", *shelf_scraper.available_parsers()]
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        shared = manager.dict()
+        for name in backends:
+            proc = ctx.Process(target=run_backend, args=(name, args.repeat, shared)); proc.start(); proc.join()
+            if proc.exitcode: print(f"❌ Backend {name} failed (exit {proc.exitcode})")
+        results = dict(shared)
+
+    print(f"📊 {sum(len(shelf_fixtures.load_fixture_books(p)) for p in shelf_fixtures.FIXTURE_FILES)} fixture books")
+    print(f"{'backend':<12} {'rows/sec':>10} {'seconds':>9} {'py peak KB':>11} {'rss +KB':>8}")
+    for name in backends:
+        if name not in results: continue
+        r = results[name]
+        print(f"{name:<12} {r['rows_per_sec']:>10} {r['seconds']:>9} {r['peak_python_kb']:>11} {r['peak_rss_delta_kb']:>8}")
+        if r["selector_seconds"]:
+            print("             " + ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in r["selector_seconds"].items()))
+
+    report = {"python": sys.version.split()[0], "created_at": time.time(), "backends": results}
+    with open(args.json, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f: regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions: print(f"❌ Regression {line}")
+        if regressions: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# cover_store.py - Local cover store: each cover is downloaded once, resized variants are cached on disk
+# --- Imports ---
+import hashlib
+import io
+import os
+import threading
+
+import metrics
+from http_client import get_client
+
+# --- Settings ---
+COVER_STORE_DIR = os.environ.get("COVER_STORE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cover_store") # Next to this file, so app.py and generate_html.py share it from any cwd
+COVER_STORE_MAX_MB = float(os.environ.get("COVER_STORE_MAX_MB", "1024")) # Image files only; id registrations are never trimmed
+COVER_SIZES = {"thumb": 240, "texture": 512} # Variant name -> max height in px (thumb is 2x the 120px generate_html cards)
+COVER_JPEG_QUALITY = 85
+TRIM_EVERY = 200 # Writes between disk-size checks
+COVER_LOCK_STRIPES = 64 # Per-cover download/resize locks, shared by hash
+
+IMAGE_TYPES = [(b"\xff\xd8", "image/jpeg"), (b"\x89PNG", "image/png"), (b"GIF8", "image/gif"), (b"RIFF", "image/webp")]
+
+
+def cover_id(url):
+    """Stable id for a (high-res) cover URL, used in /cover/<id>."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+
+
+def image_type(data):
+    return next((mimetype for magic, mimetype in IMAGE_TYPES if data.startswith(magic)), "application/octet-stream")
+
+
+class CoverStore:
+    """Cover bytes on disk under `root`, keyed by cover_id.
+
+    `register(url)` records which URL an id stands for, so a later /cover/<id> request (or another
+    process sharing the directory) can fetch it. The original is downloaded at most once, even with
+    concurrent callers; resized variants are made from it with Pillow and cached next to it.
+    """
+
+    def __init__(self, root=COVER_STORE_DIR, max_mb=COVER_STORE_MAX_MB, client=None):
+        self.root = root; self.max_bytes = int(max_mb * 1024 * 1024); self.client = client
+        self._lock = threading.Lock(); self._id_locks = [threading.Lock() for _ in range(COVER_LOCK_STRIPES)]; self._writes = 0
+
+    def register(self, url):
+        """cover_id for `url`, remembered on disk; None for an empty URL."""
+        if not url: return None
+        cid = cover_id(url); path = self._path(cid, "url")
+        if not os.path.exists(path): self._write(path, url.encode("utf-8"), trim=False)
+        return cid
+
+    def url_for(self, cid):
+        try:
+            with open(self._path(cid, "url"), encoding="utf-8") as f: return f.read().strip() or None
+        except (OSError, ValueError): return None
+
+    def original(self, url):
+        """Original cover bytes for `url`, downloading them on first use. Raises requests exceptions."""
+        cid = self.register(url); path = self._path(cid, "orig")
+        with self._id_lock(cid):
+            data = self._read(path); metrics.inc("cache_lookups", cache="cover_store", result="miss" if data is None else "hit")
+            if data is None:
+                with metrics.span("cover_download"): response = (self.client or get_client()).get(url, timeout=10); response.raise_for_status()
+                data = response.content; self._write(path, data); metrics.inc("bytes", len(data), kind="cover")
+        return data
+
+    def variant(self, cid, size=None):
+        """(bytes, mimetype) for a registered cover: the original, or a COVER_SIZES variant.
+
+        Returns None for an unknown id. Without Pillow every size is served as the original.
+        """
+        url = self.url_for(cid)
+        if not url: return None
+        data = self.original(url)
+        if size not in COVER_SIZES: return data, image_type(data)
+        path = self._path(cid, f"{size}.jpg")
+        with self._id_lock(cid):
+            resized = self._read(path)
+            if resized is None:
+                resized = resize_cover(data, COVER_SIZES[size])
+                if resized is None: return data, image_type(data)
+                self._write(path, resized)
+        return resized, "image/jpeg"
+
+    # --- Storage ---
+    def _path(self, cid, suffix):
+        return os.path.join(self.root, cid[:2], f"{cid}.{suffix}")
+
+    def _id_lock(self, cid):
+        # Striped: covers sharing a stripe just wait for each other, and the lock count stays fixed
+        return self._id_locks[hash(cid) % len(self._id_locks)]
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f: return f.read()
+        except OSError: return None
+
+    def _write(self, path, data, trim=True):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f: f.write(data)
+        os.replace(tmp_path, path)
+        if not trim: return
+        with self._lock: self._writes += 1; due = self._writes % TRIM_EVERY == 0
+        if due: self._trim_disk()
+
+    def _trim_disk(self):
+        # Drop the least recently written images until they fit max_bytes; they are re-fetched on demand
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith((".url", ".tmp")): continue
+                try: stat = os.stat(os.path.join(dirpath, name)); files.append((stat.st_mtime, stat.st_size, os.path.join(dirpath, name)))
+                except OSError: continue
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes: break
+            try: os.remove(path); total -= size
+            except OSError: pass
+
+
+def resize_cover(data, max_height):
+    """JPEG bytes no taller than `max_height` (never upscaled), or None without Pillow / for unreadable images."""
+    try: from PIL import Image
+    except ImportError: return None
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.format == "JPEG": img.draft("RGB", (1, max_height)) # Let libjpeg decode at a reduced scale, still at least max_height tall
+        img = img.convert("RGB"); img.thumbnail((max_height * 4, max_height))
+        out = io.BytesIO(); img.save(out, "JPEG", quality=COVER_JPEG_QUALITY, optimize=True)
+        return out.getvalue()
+    except OSError: return None
+
+
+# --- Shared Instance ---
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_default_store():
+    """Process-wide store shared by the /cover proxy and spine-color analysis."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None: _default_store = CoverStore()
+        return _default_store
@@ -1,6 +1,11 @@
-import requests
-from bs4 import BeautifulSoup
+import os
 import sys
+from html import escape
+import shelf_sync
+import shelf_export
+from shelf_scraper import iter_shelf_pages, high_res_cover_url, PageFetchError
+from http_client import get_client
+from cover_store import get_default_store
 
 def format_rating(rating):
     if not rating:
@@ -25,8 +30,9 @@ def format_rating(rating):
     except:
         return "N/F"  # Not Found
 
-def generate_html(books, output_path="index.html"):
-    # Start building the HTML string
+COUNT_PLACEHOLDER = " " * 12 # Room for the book count, filled in once every card is written
+
+def _page_head():
     html_parts = [
         '<!DOCTYPE html>',
         '<html>',
@@ -89,84 +95,123 @@ def generate_html(books, output_path="index.html"):
         '            color: #6772e5;',
         '            font-weight: 500;',
         '        }',
+        '        .pages {',
+        '            display: flex;',
+        '            justify-content: space-between;',
+        '            color: #1a1f36;',
+        '        }',
+        '        .pages a {',
+        '            color: #6772e5;',
+        '        }',
         '    </style>',
         '</head>',
         '<body>',
         '    <div class="content">',
         '        <h1>📚 My Reading Journey</h1>',
-        f'        <div class="stats"><strong>{len(books)}</strong> books read</div>',
+        '        <div class="stats"><strong>',
     ]
-
-    # Add each book to the HTML
-    for book in books:
-        book_html = [
-            '        <div class="book">',
-            f'            <img src="{book["image"] or ""}" alt="Cover">',
-            f'            <h2>{book["title"]}</h2>',
-            f'            <p><em>by {book["author"]}</em></p>',
-            f'            <p class="rating">{format_rating(book["rating"])}</p>',
-            f'            <p>{book["review"] or ""}</p>',
-            '            <div style="clear: both;"></div>',
-            '        </div>'
-        ]
-        html_parts.extend(book_html)
-
-    # Close the HTML structure
-    html_parts.extend([
-        '    </div>',
-        '</body>',
-        '</html>'
-    ])
-
-    # Combine all parts into a single HTML string
-    final_html = '\n'.join(html_parts)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
-
-    print(f"✅ HTML bookshelf saved to {output_path}")
+    return '\n'.join(html_parts)
+
+def cover_src(book, cover_proxy=None):
+    # With cover_proxy (the app's base URL), cards load a cached thumbnail from its /cover proxy.
+    # Registered as the high-res URL, like app.py does, so both share one stored original per cover.
+    cid = get_default_store().register(high_res_cover_url(book["image"]) or book["image"]) if cover_proxy else None
+    return f"{cover_proxy.rstrip('/')}/cover/{cid}?size=thumb" if cid else book["image"] or ""
+
+def render_book(book, cover_proxy=None):
+    # One card; every interpolated value is HTML-escaped
+    book_html = [
+        '        <div class="book">',
+        f'            <img src="{escape(cover_src(book, cover_proxy))}" alt="Cover" loading="lazy" decoding="async">',
+        f'            <h2>{escape(book["title"] or "")}</h2>',
+        f'            <p><em>by {escape(book["author"] or "")}</em></p>',
+        f'            <p class="rating">{escape(format_rating(book["rating"]))}</p>',
+        f'            <p>{escape(book["review"] or "")}</p>',
+        '            <div style="clear: both;"></div>',
+        '        </div>'
+    ]
+    return '\n'.join(book_html) + '\n'
+
+def page_path(output_path, number):
+    # index.html, index-2.html, index-3.html, ...
+    root, ext = os.path.splitext(output_path)
+    return output_path if number == 1 else f"{root}-{number}{ext}"
+
+def _page_link(output_path, number, label):
+    return f'<a href="{escape(os.path.basename(page_path(output_path, number)))}">{label}</a>'
+
+def generate_html(books, output_path="index.html", page_size=None, cover_proxy=None):
+    # Streams the page: `books` can be any iterable (e.g. a generator straight from the
+    # scraper). Each card is written as soon as it is rendered, so memory stays flat no
+    # matter how large the shelf is; the count is patched into a placeholder at the end.
+    # With `page_size`, the shelf is split into output_path, <name>-2.html, ... with
+    # newer/older links, so the first page costs the same however long the shelf is.
+    # With `cover_proxy` (e.g. "http://localhost:5000"), covers come from app.py's /cover proxy.
+    books = iter(books); pending = next(books, None)
+    count = 0; number = 0; patches = [] # (path, byte offset, "count" | "pages")
+    while number == 0 or pending is not None:
+        number += 1; path = page_path(output_path, number); on_page = 0
+        with open(path, "wb") as f:
+            f.write(_page_head().encode("utf-8"))
+            patches.append((path, f.tell(), "count"))
+            f.write(f'{COUNT_PLACEHOLDER}</strong> books read</div>\n'.encode("utf-8"))
+
+            while pending is not None and (not page_size or on_page < page_size):
+                f.write(render_book(pending, cover_proxy).encode("utf-8"))
+                count += 1; on_page += 1; pending = next(books, None)
+
+            if page_size:
+                newer = _page_link(output_path, number - 1, "← Newer") if number > 1 else '<span></span>'
+                f.write(f'        <nav class="pages">{newer}<span>Page {number} of '.encode("utf-8"))
+                patches.append((path, f.tell(), "pages"))
+                older = _page_link(output_path, number + 1, "Older →") if pending is not None else '<span></span>'
+                f.write(f'{COUNT_PLACEHOLDER}</span>{older}</nav>\n'.encode("utf-8"))
+            f.write('\n'.join(['    </div>', '</body>', '</html>']).encode("utf-8"))
+
+    for path, offset, field in patches:
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            f.write(str(count if field == "count" else number).ljust(len(COUNT_PLACEHOLDER)).encode("utf-8"))
+
+    # Drop pages left over from an earlier, longer paginated run (a single-page render leaves siblings alone)
+    stale = number + 1
+    while page_size and os.path.exists(page_path(output_path, stale)):
+        os.remove(page_path(output_path, stale)); stale += 1
+
+    print(f"✅ HTML bookshelf saved to {output_path}" + (f" ({number} pages)" if page_size else ""))
+    return count
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("❌ Usage: python3 generate_html.py <Goodreads shelf URL>")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    page_size = [int(a.split("=", 1)[1]) for a in sys.argv[1:] if a.startswith("--page-size=")]
+    cover_proxy = [a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--cover-proxy=")]
+    if len(args) != 1:
+        print("❌ Usage: python3 generate_html.py <Goodreads shelf URL> [--full] [--page-size=N] [--cover-proxy=http://localhost:5000] [--jsonl=PATH] [--parquet=DIR]")
         sys.exit(1)
 
-    base_url = sys.argv[1]
-    headers = {"User-Agent": "Mozilla/5.0"}
-    books = []
-    page = 1
-
-    while True:
-        print(f"\n🔄 Scraping page {page}...")
-        url = f"{base_url}&page={page}"
-        response = requests.get(url, headers=headers, timeout=10)
-
-        if response.status_code != 200:
-            print("❌ Failed to fetch page:", response.status_code)
-            break
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        rows = soup.select('tr[id^="review_"]')
-
-        if not rows:
-            print("✅ No more books found. Stopping.")
-            break
-
-        for row in rows:
-            title_tag = row.select_one('td.field.title .value a')
-            author_tag = row.select_one('td.field.author .value a')
-            image_tag = row.select_one('td.field.cover img')
-            rating_tag = row.select_one('td.field.rating .value span.staticStars')
-            review_tag = row.select_one('td.field.review .value span.greyText')
-
-            books.append({
-                "title": title_tag.text.strip() if title_tag else None,
-                "author": author_tag.text.strip() if author_tag else None,
-                "image": image_tag["src"] if image_tag else None,
-                "rating": rating_tag["title"] if rating_tag and rating_tag.has_attr("title") else None,
-                "review": review_tag.text.strip() if review_tag else None
-            })
-
-        page += 1
-
-    generate_html(books)
+    base_url = args[0]
+    fetch = {"complete": False, "new": 0}
+
+    # Re-syncs stop at the first review stored last time (--full re-walks every page)
+    incremental = "--full" not in sys.argv and shelf_sync.supports_incremental(base_url)
+    known_ids = shelf_sync.stored_ids(base_url, "generate_html") if incremental else []
+
+    def new_books():
+        try:
+            for page in iter_shelf_pages(base_url, known_ids=set(known_ids), stored_count=len(known_ids)):
+                print(f"\n🔄 Scraped page {page.number} ({len(page.books)} books)")
+                for book in page.books:
+                    fetch["new"] += 1
+                    yield {key: book[key] for key in ("review_id", "title", "author", "image", "rating", "review")}
+            fetch["complete"] = True
+            print(f"✅ No more new books found. {fetch['new']} new.")
+        except PageFetchError as e:
+            print("❌", e)
+
+    # Books flow scraper -> state file -> HTML one at a time; nothing holds the whole shelf
+    stored_books = shelf_sync.iter_books(base_url, "generate_html") if incremental else ()
+    with shelf_sync.StateWriter(base_url, "generate_html") as state, shelf_export.open_export(base_url, **shelf_export.export_args(sys.argv)) as export:
+        generate_html(state.tee(shelf_sync.iter_merged(export.tee(new_books()), stored_books)), page_size=page_size[-1] if page_size else None, cover_proxy=cover_proxy[-1] if cover_proxy else None)
+        if fetch["complete"]:
+            state.commit()
+    print(f"🌐 HTTP: {get_client().summary()}")
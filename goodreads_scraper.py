@@ -1,51 +1,43 @@
-import requests
-from bs4 import BeautifulSoup
+import sys
+import shelf_sync
+import shelf_export
+from shelf_scraper import iter_shelf_pages, shelf_url, PageFetchError
+from http_client import get_client
 
 USER_ID = "33279125-prakhar-gupta"
-BASE_URL = f"https://www.goodreads.com/review/list/{USER_ID}?shelf=read&page="
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-page = 1
-total_books = 0
-
-while True:
-    print(f"\n🔄 Scraping page {page}...")
-    url = BASE_URL + str(page)
-    response = requests.get(url, headers=HEADERS, timeout=10)
-    print("✅ Page fetched successfully.")
-
-    if response.status_code != 200:
-        print("❌ Failed to fetch page:", response.status_code)
-        break
-
-    soup = BeautifulSoup(response.text, "html.parser")
-    books = soup.select('tr[id^="review_"]')
-
-    if not books:
-        print("✅ No more books found. Stopping.")
-        break
-
-    for book in books:
-        title_tag = book.select_one('td.field.title .value a')
-        author_tag = book.select_one('td.field.author .value a')
-        image_tag = book.select_one('td.field.cover img')
-        rating_tag = book.select_one('td.field.rating .value span.staticStars')
-        review_tag = book.select_one('td.field.review .value span.greyText')
-
-        if title_tag and author_tag:
-            title = title_tag.text.strip()
-            author = author_tag.text.strip()
-            image_url = image_tag['src'] if image_tag else None
-            rating_text = rating_tag['title'] if rating_tag and rating_tag.has_attr('title') else None
-            review = review_tag.text.strip() if review_tag else None
-
-            print(f"📖 {title} by {author}")
-            print(f"🖼️  Cover: {image_url}")
-            print(f"⭐ Your Rating: {rating_text}")
-            print(f"💬 Review: {review}\n")
-
-    page += 1
-
-
-
-
+# A user id or shelf URL on the command line overrides USER_ID (batch_scrape.py handles many at once)
+SHELF_URL = shelf_url(next((a for a in sys.argv[1:] if not a.startswith("--")), USER_ID))
+
+new_books = []
+complete = False
+
+# Only books added since the last run are fetched and printed (--full re-walks every page)
+stored_books = [] if "--full" in sys.argv else shelf_sync.load_books(SHELF_URL, "goodreads_scraper")
+known_ids = {b["review_id"] for b in stored_books if b.get("review_id")}
+
+# --jsonl=PATH / --parquet=DIR also append the new books to an export for analytics
+try:
+    with shelf_export.open_export(SHELF_URL, **shelf_export.export_args(sys.argv)) as export: # Closed (parts finalized, batch flushed) on any exit
+        for page in iter_shelf_pages(SHELF_URL, known_ids=known_ids, stored_count=len(stored_books)):
+            print(f"\n🔄 Scraped page {page.number}...")
+            print("✅ Page fetched successfully.")
+
+            for book in page.books:
+                if book["title"] and book["author"]:
+                    print(f"📖 {book['title']} by {book['author']}")
+                    print(f"🖼️  Cover: {book['image']}")
+                    print(f"⭐ Your Rating: {book['rating']}")
+                    print(f"💬 Review: {book['review']}\n")
+                    new_books.append({key: book[key] for key in ("review_id", "title", "author", "image", "rating", "review")})
+                    export.add(book)
+        complete = True
+        print("✅ No more new books found. Stopping.")
+except PageFetchError as e:
+    print("❌", e)
+if export.count: print(f"📦 Exported {export.count} books.")
+
+if complete:
+    all_books = shelf_sync.merge_books(new_books, stored_books)
+    shelf_sync.save_books(SHELF_URL, "goodreads_scraper", all_books)
+    print(f"📚 {len(new_books)} new books, {len(all_books)} total.")
+print(f"🌐 HTTP: {get_client().summary()}")
@@ -0,0 +1,99 @@
+# http_client.py - Shared pooled HTTP client with retry/backoff for Goodreads pages and covers
+# --- Imports ---
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Settings ---
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "3")) # Extra attempts after the first
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5")) # Base delay; doubles each retry
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "30")) # Also caps Retry-After
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "10")) # Hosts with their own keep-alive pool
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "32")) # Connections kept per host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+HTTP_TRANSPORT = os.environ.get("HTTP_TRANSPORT", "live") # "record" / "replay" go through http_replay's archive
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value: return None
+    if value.strip().isdigit(): return float(value)
+    try: return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+
+class HttpClient:
+    """requests.Session with per-host connection pools, retries and counters.
+
+    GETs that fail with a connection error, timeout, 429 or 5xx are retried up to `retries`
+    times with exponential backoff and full jitter; a Retry-After header takes precedence.
+    The last response is returned once retries run out, so callers still raise_for_status().
+    `transport` "record" or "replay" swaps the network adapter for http_replay's.
+    """
+
+    def __init__(self, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, backoff_max=HTTP_BACKOFF_MAX,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), pool_hosts=HTTP_POOL_HOSTS, pool_size=HTTP_POOL_SIZE, transport=HTTP_TRANSPORT):
+        self.retries = retries; self.backoff = backoff; self.backoff_max = backoff_max; self.timeout = timeout
+        self.session = requests.Session(); self.session.headers.update(HEADERS)
+        if transport and transport != "live":
+            import http_replay
+            http_replay.mount(self.session, transport, pool_connections=pool_hosts, pool_maxsize=pool_size)
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "bytes": 0, "seconds": 0.0}
+
+    def get(self, url, timeout=None, **kwargs):
+        """GET with retries. `timeout` may be a read timeout or a (connect, read) tuple."""
+        if isinstance(timeout, (int, float)): timeout = (min(self.timeout[0], timeout), timeout)
+        attempt = 0
+        while True:
+            start = time.perf_counter(); response = None; error = None
+            try:
+                response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+                size = len(response.content) # Reads the body so the connection goes back to the pool
+            except requests.exceptions.RequestException as e: error = e; size = 0
+            self._count(requests=1, bytes=size, seconds=time.perf_counter() - start)
+            retryable = error is not None and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+            retryable = retryable or (response is not None and response.status_code in RETRY_STATUSES)
+            if not retryable or attempt >= self.retries:
+                if error is not None or response.status_code >= 400: self._count(failures=1)
+                if error is not None: raise error
+                return response
+            attempt += 1; self._count(retries=1)
+            delay = retry_after_seconds(response)
+            if delay is None: delay = random.uniform(0, self.backoff * 2 ** (attempt - 1)) # Full jitter
+            time.sleep(min(delay, self.backoff_max))
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items(): self.counters[name] += delta
+
+    def stats(self):
+        with self._lock: return dict(self.counters, seconds=round(self.counters["seconds"], 3))
+
+    def summary(self):
+        s = self.stats()
+        return f"{s['requests']} requests, {s['retries']} retries, {s['failures']} failed, {s['bytes'] / 1e6:.1f} MB in {s['seconds']:.1f}s"
+
+
+# --- Shared Instance ---
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide client shared by page fetching and cover downloads."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None: _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,159 @@
+# http_replay.py - Record/replay transport for http_client, for deterministic offline runs and load tests
+#
+# HTTP_TRANSPORT=record saves every shelf page and cover the app fetches into HTTP_ARCHIVE_DIR;
+# HTTP_TRANSPORT=replay serves them back from there without touching the network, with optional
+# simulated latency (REPLAY_LATENCY +/- REPLAY_JITTER seconds) and failures (REPLAY_ERROR_RATE of
+# requests answered 503, which http_client then retries). Both are requests transport adapters
+# mounted on HttpClient's session, so retries, pooling and metrics behave as they do live.
+#
+# Seed an archive from the bundled bookshelf files (shelves of 10, 100 and 1000 books):
+#     python3 http_replay.py seed [--archive DIR] [--sizes 10,100,1000]
+# then e.g. HTTP_TRANSPORT=replay python3 app.py and load
+#     https://www.goodreads.com/review/list/fixture-100?shelf=read
+# --- Imports ---
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+# --- Settings ---
+HTTP_ARCHIVE_DIR = os.environ.get("HTTP_ARCHIVE_DIR", "http_archive")
+REPLAY_LATENCY = float(os.environ.get("REPLAY_LATENCY", "0")) # Mean seconds added to every replayed response
+REPLAY_JITTER = float(os.environ.get("REPLAY_JITTER", "0")) # Latency varies uniformly by +/- this much
+REPLAY_ERROR_RATE = float(os.environ.get("REPLAY_ERROR_RATE", "0")) # Fraction of replayed requests answered 503
+REPLAY_SEED = os.environ.get("REPLAY_SEED", "0") # Same seed + same request order = same latencies and failures
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+FIXTURE_SHELF_URL = "https://www.goodreads.com/review/list/fixture-{size}?shelf=read"
+
+
+class Archive:
+    """One response per URL on disk: <sha1>.json (url, status, headers) and <sha1>.body."""
+
+    def __init__(self, root=HTTP_ARCHIVE_DIR):
+        self.root = root; self._lock = threading.Lock()
+
+    def _path(self, url, suffix):
+        return os.path.join(self.root, hashlib.sha1(url.encode("utf-8")).hexdigest() + suffix)
+
+    def save(self, url, status, headers, body):
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._path(url, ".body"), "wb") as f: f.write(body)
+            meta = {"url": url, "status": status, "headers": {k: headers[k] for k in KEPT_HEADERS if headers.get(k)}}
+            with open(self._path(url, ".json"), "w", encoding="utf-8") as f: json.dump(meta, f)
+
+    def load(self, url):
+        """(status, headers, body) or None if `url` was never recorded."""
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f: meta = json.load(f)
+            with open(self._path(url, ".body"), "rb") as f: body = f.read()
+        except (OSError, ValueError): return None
+        return meta["status"], meta["headers"], body
+
+
+def _response(request, status, headers, body):
+    response = Response()
+    response.status_code = status; response.headers = CaseInsensitiveDict(headers); response._content = body
+    response.url = request.url; response.request = request; response.reason = "Replayed"
+    response.encoding = "utf-8" if "text" in headers.get("Content-Type", "text/html") else None
+    return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    """A normal HTTPAdapter that also saves each successful GET into `archive`."""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs); self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method == "GET" and response.status_code == 200:
+            self.archive.save(request.url, response.status_code, response.headers, response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves GETs from `archive`; unrecorded URLs get a 404 with X-Replay: miss."""
+
+    def __init__(self, archive, latency=REPLAY_LATENCY, jitter=REPLAY_JITTER, error_rate=REPLAY_ERROR_RATE, seed=REPLAY_SEED):
+        super().__init__()
+        self.archive = archive; self.latency = latency; self.jitter = jitter; self.error_rate = error_rate
+        self._random = random.Random(seed); self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock: delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)); fail = self._random.random() < self.error_rate
+        if delay: time.sleep(delay)
+        if fail: return _response(request, 503, {"Content-Type": "text/plain", "X-Replay": "injected-error"}, b"Simulated failure")
+        found = self.archive.load(request.url)
+        if found is None: return _response(request, 404, {"Content-Type": "text/plain", "X-Replay": "miss"}, b"Not in archive")
+        status, headers, body = found
+        if headers.get("ETag") and request.headers.get("If-None-Match") == headers["ETag"]: return _response(request, 304, headers, b"")
+        return _response(request, status, {**headers, "X-Replay": "hit"}, body)
+
+    def close(self): pass
+
+
+def mount(session, mode, archive_dir=None, **adapter_kwargs):
+    """Mount the `mode` ("record" or "replay") transport on a requests.Session for http(s) URLs.
+
+    `adapter_kwargs` (HTTPAdapter pool sizes) only matter when recording; replay never opens a connection.
+    """
+    archive = Archive(archive_dir or HTTP_ARCHIVE_DIR)
+    if mode == "record": adapter = RecordingAdapter(archive, **adapter_kwargs)
+    elif mode == "replay": adapter = ReplayAdapter(archive) # Latency/errors come from the REPLAY_* settings
+    else: raise ValueError(f"Unknown HTTP transport {mode!r} (use live, record or replay)")
+    session.mount("https://", adapter); session.mount("http://", adapter)
+    return adapter
+
+
+# --- Seeding From The Bundled Fixtures ---
+def fixture_cover(url, size=(300, 450)):
+    """A deterministic JPEG cover for `url` (solid color with a darker spine edge), or None without Pillow."""
+    try: from PIL import Image, ImageDraw
+    except ImportError: return None
+    digest = hashlib.sha1(url.encode("utf-8")).digest()
+    img = Image.new("RGB", size, tuple(digest[:3])); draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size[0] // 10, size[1]), fill=tuple(c // 2 for c in digest[:3]))
+    out = io.BytesIO(); img.save(out, "JPEG", quality=80); return out.getvalue()
+
+
+def seed_archive(archive_dir=None, sizes=(10, 100, 1000)):
+    """Record FIXTURE_SHELF_URL shelves of each size, built by cycling through the fixture books."""
+    import shelf_fixtures
+    from shelf_scraper import high_res_cover_url
+    archive = Archive(archive_dir or HTTP_ARCHIVE_DIR); books = []; seen = set()
+    for path in shelf_fixtures.FIXTURE_FILES:
+        for book in shelf_fixtures.load_fixture_books(path):
+            if (book["title"], book["author"]) not in seen: seen.add((book["title"], book["author"])); books.append(book)
+    covers = 0
+    for size in sizes:
+        shelf = [books[i % len(books)] for i in range(size)]; url = FIXTURE_SHELF_URL.format(size=size)
+        page_count = -(-size // shelf_fixtures.PER_PAGE)
+        for page in range(1, page_count + 2): # Plus the empty page after the last one
+            html = shelf_fixtures.render_shelf_page(shelf, page, size)
+            headers = {"Content-Type": "text/html; charset=utf-8", "ETag": f'"fixture-{size}-{page}"'}
+            archive.save(f"{url}&page={page}", 200, headers, html.encode("utf-8"))
+        for book in shelf:
+            cover_url = high_res_cover_url(book["image"])
+            if not cover_url or archive.load(cover_url): continue
+            body = fixture_cover(cover_url)
+            if body: archive.save(cover_url, 200, {"Content-Type": "image/jpeg"}, body); covers += 1
+        print(f"✅ Seeded {url} ({size} books, {page_count} pages)")
+    print(f"🖼️  {covers} covers written to {archive.root}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the HTTP record/replay archive")
+    parser.add_argument("command", choices=["seed"], help="seed: build fixture shelves from the bundled bookshelf files")
+    parser.add_argument("--archive", default=HTTP_ARCHIVE_DIR, help=f"Archive directory (default {HTTP_ARCHIVE_DIR})")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated shelf sizes (default 10,100,1000)")
+    args = parser.parse_args()
+    seed_archive(args.archive, [int(s) for s in args.sizes.split(",")])
@@ -0,0 +1,127 @@
+# metrics.py - In-process counters and stage timing histograms, exposed in Prometheus text format
+#
+#     with metrics.span("page_fetch"): ...        # -> bookshelf_stage_seconds{stage="page_fetch"} histogram
+#     metrics.inc("rows", len(books))             # -> bookshelf_rows_total counter
+#
+# app.py serves metrics.render() at /metrics. Set PROFILE_DIR to allow per-request profile dumps
+# (POST /jobs or /get_books with profile=1), written by profile_call().
+# --- Imports ---
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Settings ---
+METRICS_PREFIX = "bookshelf_"
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30) # Seconds
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "") # Where profile=1 requests dump to (empty = profiling disabled)
+
+HELP = {
+    "stage_seconds": "Time spent in each scrape stage",
+    "pages": "Shelf pages fetched",
+    "rows": "Shelf rows parsed",
+    "books": "Books returned by finished scrapes",
+    "covers": "Spine colors computed, by result",
+    "bytes": "Bytes downloaded, by kind",
+    "cache_lookups": "Cache lookups, by cache and result",
+    "errors": "Errors, by stage",
+}
+
+
+class Registry:
+    """Thread-safe counters and fixed-bucket histograms keyed by (name, sorted label items)."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets; self._lock = threading.Lock()
+        self.counters = {}; self.histograms = {} # key -> value; key -> [per-bucket counts..., +Inf count, sum]
+        self.collectors = [] # Callables returning [(name, type, labels, value)] at render time
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock: self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None: hist = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            hist[next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))] += 1
+            hist[-1] += value
+
+    @contextmanager
+    def span(self, stage):
+        # Times the block into stage_seconds{stage=...}, whether or not it raises
+        start = time.perf_counter()
+        try: yield
+        finally: self.observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def stage_totals(self):
+        """{stage: (count, seconds)} from the stage_seconds histograms."""
+        with self._lock:
+            return {dict(labels)["stage"]: (sum(hist[:-1]), hist[-1]) for (name, labels), hist in self.histograms.items() if name == "stage_seconds"}
+
+    def render(self):
+        """Prometheus text exposition (format 0.0.4)."""
+        with self._lock: counters = dict(self.counters); histograms = {k: list(v) for k, v in self.histograms.items()}
+        lines = []; seen = set()
+        def header(name, kind):
+            if name in seen: return
+            seen.add(name)
+            help_text = HELP.get(name) or HELP.get(name.removesuffix("_total"))
+            if help_text: lines.append(f"# HELP {METRICS_PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} {kind}")
+        for (name, labels), value in sorted(counters.items()):
+            header(f"{name}_total", "counter"); lines.append(f"{METRICS_PREFIX}{name}_total{_labels(labels)} {value}")
+        for (name, labels), hist in sorted(histograms.items()):
+            header(name, "histogram"); cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], hist[:-1]):
+                cumulative += count; lines.append(f"{METRICS_PREFIX}{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{METRICS_PREFIX}{name}_sum{_labels(labels)} {round(hist[-1], 6)}")
+            lines.append(f"{METRICS_PREFIX}{name}_count{_labels(labels)} {cumulative}")
+        for collect in self.collectors:
+            for name, kind, labels, value in collect():
+                header(name, kind); lines.append(f"{METRICS_PREFIX}{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(items):
+    if not items: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+# --- Shared Registry ---
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+span = REGISTRY.span
+render = REGISTRY.render
+
+def add_collector(collect):
+    """Register collect() -> [(name, "counter" | "gauge", labels dict, value)], called on every render."""
+    REGISTRY.collectors.append(collect)
+
+
+# --- Profiling ---
+def profile_call(path, fn, *args, **kwargs):
+    """fn(*args, **kwargs) under cProfile; dumps `path`.prof (pstats) and `path`.txt.
+
+    The text report first lists how much each stage's stage_seconds grew during the call, which
+    covers worker threads too (cover downloads), including those of scrapes that overlapped this
+    one; then the top functions by cumulative time on the calling thread.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    before = REGISTRY.stage_totals(); profiler = cProfile.Profile(); start = time.perf_counter()
+    try: return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start; profiler.dump_stats(f"{path}.prof")
+        out = io.StringIO(); pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+        with open(f"{path}.txt", "w", encoding="utf-8") as f:
+            f.write(f"Wall time: {elapsed:.3f}s\n\nStage totals during the call (all threads):\n")
+            for stage, (count, seconds) in sorted(REGISTRY.stage_totals().items()):
+                old_count, old_seconds = before.get(stage, (0, 0.0))
+                if count > old_count: f.write(f"  {stage:<16} {count - old_count:>6} x {seconds - old_seconds:>9.3f}s\n")
+            f.write("\n" + out.getvalue())
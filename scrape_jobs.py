@@ -0,0 +1,114 @@
+# scrape_jobs.py - Background scrape jobs with per-job progress, shared by concurrent requests
+# --- Imports ---
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from shelf_sync import shelf_key
+
+# --- Settings ---
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4")) # Shelves scraped at the same time
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "3600")) # Seconds a finished job's result stays retrievable
+
+
+def new_progress():
+    return {"total_books": 0, "books_processed": 0, "complete": False, "error": None}
+
+
+class ScrapeJob:
+    """One scrape of one shelf URL; `progress` is updated in place by the runner.
+
+    Books the runner reports through `add_book` are kept in `streamed` (shelf order) so any
+    number of stream readers can follow the job, each from its own position.
+    """
+
+    def __init__(self, url):
+        self.id = uuid.uuid4().hex; self.url = url; self.key = shelf_key(url)
+        self.status = "queued" # queued -> running -> done | failed
+        self.progress = new_progress(); self.books = None
+        self.created_at = time.time(); self.finished_at = None
+        self.done = threading.Event()
+        self.streamed = []; self._changed = threading.Condition()
+        self.profile_path = None # Set when the submitter asked for a profile dump (metrics.PROFILE_DIR)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def add_book(self, index, book):
+        with self._changed: self.streamed.append(book); self._changed.notify_all()
+
+    def finish(self):
+        with self._changed: self.done.set(); self._changed.notify_all()
+
+    def iter_books(self, start=0, heartbeat=15):
+        """Yield (index, book) from `start` as books arrive; yields (None, None) every `heartbeat`
+        idle seconds and returns once the job is finished and everything has been yielded."""
+        index = start
+        while True:
+            with self._changed:
+                if index >= len(self.streamed) and not self.done.is_set(): self._changed.wait(heartbeat)
+                batch = self.streamed[index:]; finished = self.done.is_set()
+            if not batch and not finished: yield None, None; continue
+            for book in batch: yield index, book; index += 1
+            if finished and index >= len(self.streamed): return
+
+    def progress_snapshot(self):
+        total = self.progress.get("total_books", 0); processed = self.progress.get("books_processed", 0)
+        percent = min(100, int((processed / total) * 100)) if total > 0 else 0
+        return {"job_id": self.id, "status": self.status, "progress": percent, "books_processed": processed,
+                "total_books": total, "complete": self.done.is_set(), "error": self.progress.get("error"),
+                **({"profile": self.profile_path + ".txt"} if self.profile_path and self.done.is_set() else {})}
+
+
+class JobManager:
+    """Runs `runner(url, progress=..., on_book=...) -> books or None` on a thread pool.
+
+    A URL whose shelf already has a queued or running job joins that job instead of
+    starting another. Finished jobs are forgotten after `ttl` seconds. With profile=True (and
+    metrics.PROFILE_DIR set) a new job's runner call is profiled with metrics.profile_call.
+    """
+
+    def __init__(self, runner, max_workers=JOB_WORKERS, ttl=JOB_RESULT_TTL):
+        self.runner = runner; self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scrape-job")
+        self._lock = threading.Lock(); self._jobs = {}; self._in_flight = {} # job id -> job, shelf key -> job
+
+    def submit(self, url, profile=False):
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(shelf_key(url))
+            if job: return job
+            job = ScrapeJob(url); self._jobs[job.id] = job; self._in_flight[job.key] = job
+            if profile and metrics.PROFILE_DIR: job.profile_path = os.path.join(metrics.PROFILE_DIR, f"job-{job.id}")
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock: return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        try:
+            if job.profile_path: job.books = metrics.profile_call(job.profile_path, self.runner, job.url, progress=job.progress, on_book=job.add_book)
+            else: job.books = self.runner(job.url, progress=job.progress, on_book=job.add_book)
+        except Exception as e: traceback.print_exc(); job.progress["error"] = str(e)
+        job.progress["complete"] = True
+        job.status = "failed" if job.books is None else "done"; job.finished_at = time.time()
+        with self._lock:
+            if self._in_flight.get(job.key) is job: del self._in_flight[job.key]
+        job.finish()
+
+    def status_counts(self):
+        with self._lock:
+            counts = dict.fromkeys(["queued", "running", "done", "failed"], 0)
+            for job in self._jobs.values(): counts[job.status] += 1
+            return counts
+
+    def _prune(self):
+        # Caller holds the lock
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]: del self._jobs[job_id]
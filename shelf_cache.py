@@ -0,0 +1,106 @@
+# shelf_cache.py - Scraped-shelf result cache with TTL, memory/disk bounds and page-1 revalidation
+# --- Imports ---
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from shelf_sync import shelf_key
+from shelf_scraper import fetch_shelf_head, PageFetchError
+
+# --- Settings ---
+SHELF_CACHE_DIR = os.environ.get("SHELF_CACHE_DIR", "shelf_cache") # Empty keeps results in memory only
+SHELF_CACHE_TTL = int(os.environ.get("SHELF_CACHE_TTL", "3600")) # Seconds before a result is revalidated
+SHELF_CACHE_MAX_ENTRIES = int(os.environ.get("SHELF_CACHE_MAX_ENTRIES", "64")) # Results kept in memory
+SHELF_CACHE_MAX_DISK_MB = float(os.environ.get("SHELF_CACHE_MAX_DISK_MB", "256"))
+
+# Cache statuses, sent back to clients as X-Cache-Status
+HIT, REVALIDATED, MISS, EXPIRED = "HIT", "REVALIDATED", "MISS", "EXPIRED"
+
+
+class ShelfResultCache:
+    """Finished /get_books results keyed by shelf_sync.shelf_key (so sort/per_page matter, page doesn't).
+
+    Each entry keeps the page-1 ETag/Last-Modified and shelf total. Once older than `ttl`, `lookup`
+    re-requests page 1 conditionally: a 304, or the same total with page 1's review ids matching
+    the first cached books, renews the entry; anything else means the shelf changed and the
+    caller re-scrapes.
+    """
+
+    def __init__(self, cache_dir=SHELF_CACHE_DIR, ttl=SHELF_CACHE_TTL, max_entries=SHELF_CACHE_MAX_ENTRIES, max_disk_mb=SHELF_CACHE_MAX_DISK_MB):
+        self.cache_dir = cache_dir; self.ttl = ttl; self.max_entries = max_entries; self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self._lock = threading.Lock(); self._memory = OrderedDict() # key -> entry, least recently used first
+        self.stats = {HIT: 0, REVALIDATED: 0, MISS: 0, EXPIRED: 0}
+
+    def lookup(self, url):
+        """(entry or None, status). The entry is only returned when it can be served."""
+        key = shelf_key(url); entry = self._load(key)
+        if entry is None: return self._count(None, MISS)
+        if time.time() - entry["stored_at"] <= self.ttl: return self._count(entry, HIT)
+        if self._still_current(url, entry):
+            entry["stored_at"] = time.time(); self._save(key, entry)
+            return self._count(entry, REVALIDATED)
+        return self._count(None, EXPIRED)
+
+    def store(self, url, books, shelf_info=None):
+        key = shelf_key(url); shelf_info = shelf_info or {}
+        entry = {"shelf": key, "stored_at": time.time(), "books": books,
+                 "validators": shelf_info.get("validators") or {}, "total_books": shelf_info.get("total_books")}
+        self._save(key, entry)
+        return entry
+
+    def _still_current(self, url, entry):
+        try: head = fetch_shelf_head(url, entry.get("validators"))
+        except PageFetchError as e: print(f"Warn: Shelf revalidation failed ({e})"); return False
+        if head["not_modified"]: return True
+        head_ids = [b["review_id"] for b in head["books"] if b["title"] and b["author"]] # Only rows app.get_books_from_shelf keeps are cached
+        cached_ids = [b.get("review_id") for b in entry["books"][:len(head_ids)]]
+        return bool(head_ids) and head["total_books"] == entry.get("total_books") and head_ids == cached_ids
+
+    def _count(self, entry, status):
+        with self._lock: self.stats[status] += 1
+        return entry, status
+
+    # --- Storage ---
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, key):
+        with self._lock:
+            if key in self._memory: self._memory.move_to_end(key); return self._memory[key]
+        if not self.cache_dir: return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f: entry = json.load(f)
+        except (OSError, ValueError): return None
+        if entry.get("shelf") != key: return None
+        self._remember(key, entry)
+        return entry
+
+    def _save(self, key, entry):
+        self._remember(key, entry)
+        if not self.cache_dir: return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key); tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._trim_disk()
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry; self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries: self._memory.popitem(last=False)
+
+    def _trim_disk(self):
+        # Drop the least recently written files until the directory fits max_disk_bytes
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"): continue
+            try: stat = os.stat(os.path.join(self.cache_dir, name)); files.append((stat.st_mtime, stat.st_size, name))
+            except OSError: continue
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes: break
+            try: os.remove(os.path.join(self.cache_dir, name)); total -= size
+            except OSError: pass
@@ -0,0 +1,132 @@
+# shelf_export.py - Append-only JSONL / Parquet export of scraped shelf records for offline analytics
+#
+# Every scrape can stream its records into a JSONL file (appended to) and/or a Parquet dataset
+# directory (one part file per scrape), so downstream jobs read them without re-hitting Goodreads:
+#
+#     pyarrow.dataset.dataset("exports/parquet").to_table()
+#
+# Incremental syncs only export the books they fetched; dedupe on (shelf, review_id) by latest scraped_at.
+# --- Imports ---
+import json
+import os
+import threading
+import time
+import uuid
+
+from shelf_sync import shelf_key
+
+# --- Settings ---
+SHELF_EXPORT_JSONL = os.environ.get("SHELF_EXPORT_JSONL", "") # JSONL file every scrape appends to (empty = off)
+SHELF_EXPORT_PARQUET = os.environ.get("SHELF_EXPORT_PARQUET", "") # Directory receiving one Parquet part per scrape (empty = off)
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000")) # Records per write (and per Parquet row group)
+
+# --- Schema ---
+# Bump SCHEMA_VERSION whenever a column is added, removed or changes meaning.
+SCHEMA_VERSION = 1
+FIELDS = ["review_id", "title", "author", "publisher", "image", "rating", "review", "spine_color"]
+COLUMNS = ["schema_version", "shelf", "scraped_at", *FIELDS] # shelf: shelf_sync.shelf_key; scraped_at: unix seconds
+
+_append_locks = {}
+_append_locks_lock = threading.Lock()
+
+
+def export_record(book, shelf, scraped_at):
+    """Flat export row for one book; fields a scraper doesn't produce (e.g. spine_color) are None."""
+    return {"schema_version": SCHEMA_VERSION, "shelf": shelf, "scraped_at": scraped_at, **{f: book.get(f) for f in FIELDS}}
+
+
+def parquet_schema(pa):
+    fields = [("schema_version", pa.int16()), ("shelf", pa.string()), ("scraped_at", pa.float64()), *[(f, pa.string()) for f in FIELDS]]
+    return pa.schema(fields, metadata={"schema_version": str(SCHEMA_VERSION)})
+
+
+# --- Sinks ---
+class JsonlSink:
+    """Appends one JSON object per line; concurrent exports in this process never interleave a batch."""
+
+    def __init__(self, path):
+        self.path = path
+        with _append_locks_lock: self._lock = _append_locks.setdefault(os.path.abspath(path), threading.Lock())
+        if os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f: f.write(lines)
+
+    def close(self): pass
+
+
+class ParquetSink:
+    """Writes one part file per export into `directory`, one row group per batch. Needs pyarrow.
+
+    The part is written under a .tmp name and renamed on close, so readers globbing *.parquet
+    never see a half-written file.
+    """
+
+    def __init__(self, directory):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(directory, exist_ok=True)
+        self._pa = pa; self.schema = parquet_schema(pa); self.rows = 0
+        self.path = os.path.join(directory, f"part-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet")
+        self.tmp_path = self.path + ".tmp"; self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+
+    def write(self, records):
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self.schema)); self.rows += len(records)
+
+    def close(self):
+        self._writer.close()
+        if self.rows: os.replace(self.tmp_path, self.path)
+        else: os.remove(self.tmp_path) # Nothing scraped: don't leave empty parts behind
+
+
+# --- Export ---
+class ShelfExport:
+    """Buffers one shelf's records and writes them to every sink in batches.
+
+        with open_export(url) as export:
+            for book in books: export.add(book)
+
+    Closing flushes what was added even after an error: every record is a real scraped book.
+    """
+
+    def __init__(self, url, sinks, batch_size=EXPORT_BATCH_SIZE):
+        self.shelf = shelf_key(url); self.sinks = sinks; self.batch_size = max(1, batch_size)
+        self.scraped_at = time.time(); self.count = 0; self._batch = []
+
+    def add(self, book):
+        if not self.sinks: return
+        self._batch.append(export_record(book, self.shelf, self.scraped_at)); self.count += 1
+        if len(self._batch) >= self.batch_size: self.flush()
+
+    def tee(self, books):
+        """Yield `books` unchanged, exporting each one."""
+        for book in books: self.add(book); yield book
+
+    def flush(self):
+        if not self._batch: return
+        for sink in self.sinks: sink.write(self._batch)
+        self._batch = []
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks: sink.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc_info): self.close()
+
+
+def open_export(url, jsonl=None, parquet=None, batch_size=EXPORT_BATCH_SIZE):
+    """ShelfExport to the given JSONL file / Parquet directory (defaults: SHELF_EXPORT_*; empty disables)."""
+    jsonl = SHELF_EXPORT_JSONL if jsonl is None else jsonl; parquet = SHELF_EXPORT_PARQUET if parquet is None else parquet
+    sinks = [JsonlSink(jsonl)] if jsonl else []
+    if parquet:
+        try: sinks.append(ParquetSink(parquet))
+        except ImportError: print("Warn: pyarrow not installed, Parquet export skipped")
+    return ShelfExport(url, sinks, batch_size)
+
+
+def export_args(argv):
+    """{"jsonl": ..., "parquet": ...} from --jsonl=PATH / --parquet=DIR command-line flags."""
+    flags = {a.split("=", 1)[0][2:]: a.split("=", 1)[1] for a in argv if a.startswith(("--jsonl=", "--parquet="))}
+    return {"jsonl": flags.get("jsonl"), "parquet": flags.get("parquet")}
@@ -0,0 +1,93 @@
+# shelf_fixtures.py - Goodreads-shaped shelf pages rebuilt from the bundled bookshelf HTML files
+#
+# The saved *.html files in the repo are rendered bookshelves (div.book cards), not raw
+# Goodreads pages, so they can't be fed to the row parser directly. This module reads the
+# real titles/authors/covers/ratings out of them and re-emits them in the review-list table
+# markup that shelf_scraper parses, for offline benchmarks and replay archives.
+# --- Imports ---
+import html
+import os
+import re
+
+# --- Settings ---
+FIXTURE_FILES = [
+    "bookshelf_20089951-mahasweta-md.html",
+    "bookshelf_33279125-prakhar-gupta.html",
+    "2040005-wil-wheaton.html",
+    "20089951-mahasweta-md.html",
+]
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+PER_PAGE = 30 # Goodreads' default review-list page size
+
+_BOOK_RE = re.compile(
+    r'<div class="book">\s*<img src="(?P<image>[^"]*)"[^>]*>\s*<h2>(?P<title>.*?)</h2>\s*'
+    r'<p><em>(?:by )?(?P<author>.*?)</em></p>\s*<p[^>]*>(?P<rating>.*?)</p>\s*<p>(?P<review>.*?)</p>', re.S)
+_RATING_TITLES = {"1": "did not like it", "2": "it was ok", "3": "liked it", "4": "really liked it", "5": "it was amazing"}
+
+
+def load_fixture_books(path):
+    """Book dicts (title, author, image, rating, review) from one rendered bookshelf file."""
+    if not os.path.isabs(path): path = os.path.join(FIXTURE_DIR, path)
+    with open(path, encoding="utf-8") as f: text = f.read()
+    books = []
+    for match in _BOOK_RE.finditer(text):
+        rating = html.unescape(match["rating"]).replace("⭐", "").strip()
+        stars = re.match(r'(\d)/5', rating)
+        if stars: rating = _RATING_TITLES[stars.group(1)]
+        if rating in ("None", "No rating", "N/R", "N/F"): rating = None
+        review = html.unescape(match["review"]).strip()
+        books.append({
+            "title": html.unescape(match["title"]).strip(),
+            "author": html.unescape(match["author"]).strip(),
+            "image": match["image"],
+            "rating": rating,
+            "review": None if review in ("", "None") else review,
+        })
+    return books
+
+
+def _row(book, review_id, position):
+    e = lambda value: html.escape(value or "", quote=True)
+    stars = f'<span class="staticStars notranslate" title="{e(book["rating"])}"></span>' if book["rating"] else ""
+    review = f'<span class="greyText">{e(book["review"])}</span>' if book["review"] else ""
+    return (
+        f'<tr id="review_{review_id}" class="bookalike review">'
+        f'<td class="field checkbox"><div class="value"><input type="checkbox" name="reviews[{review_id}]"></div></td>'
+        f'<td class="field position"><label>#</label><div class="value">{position}</div></td>'
+        f'<td class="field cover"><label>cover</label><div class="value"><div class="js-tooltipTrigger tooltipTrigger">'
+        f'<a href="/book/show/{review_id}"><img alt="{e(book["title"])}" src="{e(book["image"])}"></a></div></div></td>'
+        f'<td class="field title"><label>title</label><div class="value"><a title="{e(book["title"])}" href="/book/show/{review_id}">'
+        f'{e(book["title"])}</a></div></td>'
+        f'<td class="field author"><label>author</label><div class="value"><a href="/author/show/{review_id}">{e(book["author"])}</a>'
+        f'<span title="Goodreads Author!">*</span></div></td>'
+        f'<td class="field isbn" style="display: none"><label>isbn</label><div class="value"></div></td>'
+        f'<td class="field publisher" style="display: none"><label>publisher</label><div class="value">'
+        f'{e(book.get("publisher"))}</div></td>'
+        f'<td class="field num_pages"><label>num pages</label><div class="value"><nobr>320<span class="greyText">pp</span></nobr></div></td>'
+        f'<td class="field avg_rating"><label>avg rating</label><div class="value">3.98</div></td>'
+        f'<td class="field rating"><label>Reviewer rating</label><div class="value">{stars}</div></td>'
+        f'<td class="field review"><label>review</label><div class="value">{review}</div></td>'
+        f'<td class="field date_read"><label>date read</label><div class="value"><span class="date_read_value">Jan 01, 2024</span></div></td>'
+        f'<td class="field date_added"><label>date added</label><div class="value"><span title="January 1, 2024">Jan 01, 2024</span></div></td>'
+        f'<td class="field actions"><label>actions</label><div class="value"><a class="actionLinkLite" href="/review/edit/{review_id}">edit</a></div></td>'
+        '</tr>')
+
+
+def render_shelf_page(books, page, total_books, per_page=PER_PAGE, first_review_id=9_000_000_000):
+    """One review-list page (1-based) holding books[(page-1)*per_page : page*per_page]."""
+    start = (page - 1) * per_page; chunk = books[start:start + per_page]
+    rows = "\n".join(_row(b, first_review_id - (start + i), start + i + 1) for i, b in enumerate(chunk))
+    showing = f"{start + 1}-{start + len(chunk)}" if chunk else "0-0"
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Goodreads | Read shelf</title></head><body>'
+        '<div class="mainContentFloat"><div id="header"><h1><a href="/review/list">My Books</a></h1></div>'
+        f'<div id="shelfHeader"><h1>Read</h1><span class="greyText">(showing {showing} of {total_books} books)</span></div>'
+        f'<div id="paginatedShelfList"><a class="selectedShelf" href="?shelf=read">Read ({total_books})</a></div>'
+        '<table id="books" class="table stacked" border="0"><thead><tr id="booksHeader"><th>cover</th><th>title</th></tr></thead>'
+        f'<tbody id="booksBody">\n{rows}\n</tbody></table></div></body></html>')
+
+
+def fixture_pages(path, per_page=PER_PAGE):
+    """All shelf pages for one fixture file, in order, plus the trailing empty page."""
+    books = load_fixture_books(path); page_count = -(-len(books) // per_page)
+    return [render_shelf_page(books, page, len(books), per_page) for page in range(1, page_count + 2)]
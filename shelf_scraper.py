@@ -0,0 +1,302 @@
+# shelf_scraper.py - Shared Goodreads shelf scraping core used by app.py, generate_html.py and goodreads_scraper.py
+#
+# iter_shelf_pages()/iter_shelf_books() fetch a shelf lazily, page by page, and yield plain
+# book records. Rows are parsed with the fastest installed backend (selectolax, then lxml,
+# then BeautifulSoup's html.parser); SHELF_PARSER=<name> forces one.
+# --- Imports ---
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+from http_client import get_client
+
+# --- Settings ---
+SHELF_PARSER = os.environ.get("SHELF_PARSER", "auto")
+PAGE_WORKERS = int(os.environ.get("PAGE_WORKERS", "4")) # Max shelf pages fetched at once
+PAGE_RATE_LIMIT = float(os.environ.get("PAGE_RATE_LIMIT", "2")) # Max shelf page requests started per second (0 = unlimited)
+PAGE_PROBE_FAILURES = int(os.environ.get("PAGE_PROBE_FAILURES", "3")) # Failed pages in a row that end a walk of a shelf with no count
+
+# --- Selectors (compiled once per backend) ---
+ROW_SELECTOR = 'tr[id^="review_"]'
+FIELD_SELECTORS = {
+    "title": 'td.field.title .value a',
+    "author": 'td.field.author .value a',
+    "image": 'td.field.cover img',
+    "publisher": 'td.field.publisher .value',
+    "rating": 'td.field.rating .value span.staticStars',
+    "review": 'td.field.review .value span.greyText',
+}
+COUNT_SELECTOR = '#shelfHeader .greyText'
+COUNT_FALLBACK_SELECTOR = '.selectedShelf'
+
+ShelfPage = namedtuple("ShelfPage", "number total_books books validators error", defaults=(None,)) # validators: the page's ETag/Last-Modified
+
+
+class PageFetchError(Exception):
+    """A shelf page could not be fetched; `page` is its 1-based number."""
+    def __init__(self, page, cause):
+        super().__init__(f"Failed to fetch page {page}: {cause}")
+        self.page = page
+
+
+# --- Parser Backends ---
+class SoupBackend:
+    """BeautifulSoup + soupsieve; always available alongside the app's bs4 dependency."""
+    name = "html.parser"
+
+    def __init__(self, features="html.parser"):
+        import soupsieve
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup; self._features = features; self.compile = soupsieve.compile
+
+    def document(self, html): return self._soup(html, self._features)
+    def select(self, node, selector): return selector.select(node)
+    def select_one(self, node, selector): return selector.select_one(node)
+    def text(self, node): return node.get_text()
+    def attr(self, node, name): return node.get(name)
+
+
+class LxmlBackend:
+    """lxml.html with the selectors hand-translated to precompiled XPath (no cssselect needed)."""
+    name = "lxml"
+    _XPATHS = {
+        ROW_SELECTOR: '//tr[starts-with(@id, "review_")]',
+        COUNT_SELECTOR: '//*[@id="shelfHeader"]//*[{greyText}]',
+        COUNT_FALLBACK_SELECTOR: '//*[{selectedShelf}]',
+        FIELD_SELECTORS["title"]: './/td[{field}][{title}]//*[{value}]//a',
+        FIELD_SELECTORS["author"]: './/td[{field}][{author}]//*[{value}]//a',
+        FIELD_SELECTORS["image"]: './/td[{field}][{cover}]//img',
+        FIELD_SELECTORS["publisher"]: './/td[{field}][{publisher}]//*[{value}]',
+        FIELD_SELECTORS["rating"]: './/td[{field}][{rating}]//*[{value}]//span[{staticStars}]',
+        FIELD_SELECTORS["review"]: './/td[{field}][{review}]//*[{value}]//span[{greyText}]',
+    }
+
+    def __init__(self):
+        import lxml.html
+        from lxml import etree
+        self._fromstring = lxml.html.document_fromstring; self._xpath = etree.XPath
+
+    def compile(self, selector):
+        classes = set(re.findall(r'\{(\w+)\}', self._XPATHS[selector]))
+        return self._xpath(self._XPATHS[selector].format(**{
+            c: f'contains(concat(" ", normalize-space(@class), " "), " {c} ")' for c in classes}))
+
+    def document(self, html): return self._fromstring(html)
+    def select(self, node, selector): return selector(node)
+    def select_one(self, node, selector): found = selector(node); return found[0] if found else None
+    def text(self, node): return node.text_content()
+    def attr(self, node, name): return node.get(name)
+
+
+class SelectolaxBackend:
+    """selectolax's lexbor engine; CSS is matched natively, so selectors stay as strings."""
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def compile(self, selector): return selector
+    def document(self, html): return self._parser(html)
+    def select(self, node, selector): return node.css(selector)
+    def select_one(self, node, selector): return node.css_first(selector)
+    def text(self, node): return node.text()
+    def attr(self, node, name): return node.attributes.get(name)
+
+
+BACKENDS = {"selectolax": SelectolaxBackend, "lxml": LxmlBackend, "html.parser": SoupBackend}
+_backend_cache = {}
+
+
+class ShelfParser:
+    """Turns shelf page HTML into book records using one backend's precompiled selectors."""
+
+    def __init__(self, backend):
+        self.backend = backend; self.name = backend.name
+        self.rows = backend.compile(ROW_SELECTOR)
+        self.fields = {field: backend.compile(sel) for field, sel in FIELD_SELECTORS.items()}
+        self.count = backend.compile(COUNT_SELECTOR); self.count_fallback = backend.compile(COUNT_FALLBACK_SELECTOR)
+
+    def parse(self, html):
+        """(total_books or 0, [book records]) for one page of HTML."""
+        with metrics.span("parse_document"): doc = self.backend.document(html)
+        with metrics.span("parse_rows"): total_books = self.total_books(doc); books = [self.record(row) for row in self.backend.select(doc, self.rows)]
+        metrics.inc("rows", len(books))
+        return total_books, books
+
+    def total_books(self, doc):
+        b = self.backend; count_elem = b.select_one(doc, self.count); total_books = 0
+        if count_elem is not None and 'books)' in b.text(count_elem):
+            match = re.search(r'of (\d+) books', b.text(count_elem)); total_books = int(match.group(1)) if match else 0
+        if total_books == 0:
+            fallback = b.select_one(doc, self.count_fallback)
+            digits = ''.join(filter(str.isdigit, b.text(fallback))) if fallback is not None else ""
+            total_books = int(digits) if digits else 0
+        return total_books
+
+    def record(self, row):
+        b = self.backend; found = {field: b.select_one(row, sel) for field, sel in self.fields.items()}
+        def text(field): return b.text(found[field]).strip() if found[field] is not None else None
+        row_id = b.attr(row, "id") or ""
+        return {
+            "review_id": row_id[len("review_"):] if row_id.startswith("review_") else "",
+            "title": text("title"),
+            "author": text("author"),
+            "publisher": text("publisher"),
+            "image": b.attr(found["image"], "src") if found["image"] is not None else None,
+            "rating": b.attr(found["rating"], "title") if found["rating"] is not None else None,
+            "review": text("review"),
+        }
+
+
+def get_parser(name=None):
+    """ShelfParser for `name` ("auto" picks the fastest installed backend)."""
+    name = name or SHELF_PARSER
+    if name not in _backend_cache:
+        candidates = list(BACKENDS) if name == "auto" else [name]
+        for candidate in candidates:
+            try: _backend_cache[name] = ShelfParser(BACKENDS[candidate]()); break
+            except ImportError: continue
+        else: raise ImportError(f"No shelf parser backend available for {name!r}")
+    return _backend_cache[name]
+
+
+def available_parsers():
+    names = []
+    for name in BACKENDS:
+        try: get_parser(name); names.append(name)
+        except ImportError: pass
+    return names
+
+
+# --- Fetching ---
+class RateLimiter:
+    """Spaces request starts evenly across threads: at most `rate` per second."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0; self._lock = threading.Lock(); self._next_start = 0.0
+
+    def wait(self):
+        if not self.interval: return
+        with self._lock: now = time.monotonic(); start = max(now, self._next_start); self._next_start = start + self.interval
+        if start > now: time.sleep(start - now)
+
+
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+def host_limiter(url, rate=None):
+    """RateLimiter shared by every caller fetching from `url`'s host; the first caller sets its rate."""
+    host = urlsplit(url).netloc.lower()
+    with _host_limiters_lock:
+        if host not in _host_limiters: _host_limiters[host] = RateLimiter(PAGE_RATE_LIMIT if rate is None else rate)
+        return _host_limiters[host]
+
+
+def shelf_url(user_or_url, shelf="read"):
+    """A shelf URL as given, or the `shelf` shelf of a Goodreads user id like "33279125-prakhar-gupta"."""
+    value = user_or_url.strip()
+    return value if "://" in value else f"https://www.goodreads.com/review/list/{value}?shelf={shelf}"
+
+
+def high_res_cover_url(image_url):
+    """Strip Goodreads' `._SX50_.`-style size suffix to get the full-size cover."""
+    return re.sub(r'\._S[XY]?\d+_?\.', '.', image_url) if image_url else image_url
+
+
+def _validators(response):
+    return {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+
+def _fetch_page(client, url, page, limiter, parser, timeout=10):
+    with metrics.span("page_wait"): limiter.wait()
+    try:
+        with metrics.span("page_fetch"): response = client.get(f"{url}&page={page}", timeout=timeout); response.raise_for_status()
+    except requests.exceptions.RequestException as e: metrics.inc("errors", stage="page_fetch"); raise PageFetchError(page, e) from e
+    metrics.inc("pages"); metrics.inc("bytes", len(response.content), kind="page")
+    return (*parser.parse(response.text), _validators(response))
+
+
+def fetch_shelf_head(url, validators=None, parser=None, client=None):
+    """Conditionally re-fetch page 1 to check whether a shelf changed.
+
+    Sends If-None-Match/If-Modified-Since from `validators`. Returns {"not_modified": True} on a
+    304, otherwise the page's total_books, review ids (first_ids), parsed rows (books) and new validators.
+    Raises PageFetchError.
+    """
+    validators = validators or {}; headers = {}
+    if validators.get("etag"): headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        response = (client or get_client()).get(f"{url}&page=1", headers=headers, timeout=15)
+        if response.status_code == 304: return {"not_modified": True}
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e: raise PageFetchError(1, e) from e
+    total_books, books = (parser or get_parser()).parse(response.text)
+    return {"not_modified": False, "total_books": total_books, "first_ids": [b["review_id"] for b in books], "books": books, "validators": _validators(response)}
+
+
+def iter_shelf_pages(url, known_ids=(), stored_count=0, parser=None, client=None, page_workers=None, rate_limit=None, limiter=None, skip_pages=(), skip_failed=False):
+    """Yield ShelfPage(number, total_books, books, validators, error) in shelf order.
+
+    Stops after the last page, or at the first review id in `known_ids` (that page's books are
+    cut just before it). When page 1 reports the shelf size, the remaining pages (only those
+    likely to hold new reviews when `known_ids` is given) are fetched concurrently; otherwise
+    pages are fetched one at a time until one has no rows. Requests go through `client`
+    (http_client's shared pooled client by default), which retries 429/5xx. Pass a shared `limiter`
+    (see host_limiter) to pace several concurrent shelves together. Raises PageFetchError.
+
+    Pages in `skip_pages` (page numbers, or a function given page 1's ShelfPage that returns them,
+    e.g. those a checkpoint already holds) are not fetched; they are yielded with books=None.
+    With skip_failed=True a page after the first that fails is yielded with books=[] and `error`
+    set instead of raising. Without a count the walk keeps probing past it, until a page with no
+    rows or PAGE_PROBE_FAILURES failures in a row, so failed pages never pass for the shelf's end.
+    """
+    parser = parser or get_parser(); client = client or get_client()
+    limiter = limiter or RateLimiter(PAGE_RATE_LIMIT if rate_limit is None else rate_limit)
+    page_pool = ThreadPoolExecutor(max_workers=max(1, page_workers or PAGE_WORKERS), thread_name_prefix="page"); page_futures = {}
+    try:
+        total_books, books, validators = _fetch_page(client, url, 1, limiter, parser, timeout=15)
+        last_page = None; per_page = len(books)
+        if total_books and per_page: # Known count: queue every remaining page up front
+            last_page = -(-total_books // per_page)
+            if known_ids: last_page = min(last_page, max(0, total_books - stored_count) // per_page + 1) # Page holding the first known review
+        if callable(skip_pages): skip_pages = skip_pages(ShelfPage(1, total_books, books, validators))
+        skip_pages = set(skip_pages) - {1}
+        if last_page:
+            for p in range(2, last_page + 1):
+                if p not in skip_pages: page_futures[p] = page_pool.submit(_fetch_page, client, url, p, limiter, parser)
+        page = 1; failures = 0
+        while True:
+            if page > 1:
+                if last_page and page > last_page and not known_ids: return # Count says we're past the end
+                if page in skip_pages:
+                    yield ShelfPage(page, total_books, None, None)
+                    if known_ids and last_page and page >= last_page: return # The cut page was already fetched; the caller has it
+                    page += 1; continue
+                try: _, books, validators = page_futures.pop(page).result() if page in page_futures else _fetch_page(client, url, page, limiter, parser)
+                except PageFetchError as e:
+                    if not skip_failed: raise
+                    yield ShelfPage(page, total_books, [], None, str(e.__cause__ or e)); failures += 1
+                    if last_page and page >= last_page: return
+                    if not last_page and failures >= PAGE_PROBE_FAILURES: return # Give up probing; the failed pages mark the gap
+                    page += 1; continue
+                failures = 0
+            if not books: return
+            for i, book in enumerate(books):
+                if book["review_id"] in known_ids: yield ShelfPage(page, total_books, books[:i], validators); return
+            yield ShelfPage(page, total_books, books, validators)
+            page += 1
+    finally:
+        page_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_shelf_books(url, **kwargs):
+    """Book records one at a time, in shelf order; see iter_shelf_pages for arguments."""
+    for page in iter_shelf_pages(url, **kwargs): yield from page.books
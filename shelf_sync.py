@@ -0,0 +1,152 @@
+# shelf_sync.py - Per-shelf sync state so re-syncs only fetch pages with new reviews
+# --- Imports ---
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# --- Settings ---
+STATE_DIR = os.environ.get("SHELF_STATE_DIR", "shelf_state")
+NEWEST_FIRST_SORTS = ("date_read", "date_added", "date_updated") # Sorts where new reviews land on page 1
+PAGE_CHECKPOINT_TTL = int(os.environ.get("PAGE_CHECKPOINT_TTL", str(24 * 3600))) # Seconds an unfinished scrape's pages stay resumable
+
+
+def shelf_key(url):
+    """Shelf URL without paging, with query params in a stable order."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def supports_incremental(url):
+    """Stopping at the first known review is only safe when newest reviews come first."""
+    params = dict(parse_qsl(urlsplit(url).query))
+    return params.get("sort", "date_read") in NEWEST_FIRST_SORTS and params.get("order", "d") != "a"
+
+
+def _state_path(url, namespace):
+    digest = hashlib.sha1(shelf_key(url).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(STATE_DIR, f"{namespace}-{digest}.jsonl")
+
+
+def iter_books(url, namespace):
+    """Books stored by the last sync of this shelf, newest first, read lazily (none if never synced).
+
+    State files are JSON lines: a {"shelf", "synced_at"} header, then one book per line.
+    """
+    try: f = open(_state_path(url, namespace), encoding="utf-8")
+    except OSError: return
+    with f:
+        try: header = json.loads(f.readline() or "{}")
+        except ValueError: return
+        if header.get("shelf") != shelf_key(url): return
+        for line in f:
+            if line.strip(): yield json.loads(line)
+
+
+def load_books(url, namespace):
+    return list(iter_books(url, namespace))
+
+
+def stored_ids(url, namespace):
+    """Review ids of the stored books, in order, without keeping the books themselves."""
+    return [b.get("review_id") for b in iter_books(url, namespace)]
+
+
+class StateWriter:
+    """Writes a shelf's new state one book at a time; it only replaces the old state on commit().
+
+        with StateWriter(url, "generate_html") as state:
+            for book in books: state.add(book)
+            if sync_finished: state.commit()
+    """
+
+    def __init__(self, url, namespace):
+        self.path = _state_path(url, namespace); self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.header = {"shelf": shelf_key(url), "synced_at": time.time()}; self._file = None
+
+    def __enter__(self):
+        os.makedirs(STATE_DIR, exist_ok=True)
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write(json.dumps(self.header) + "\n")
+        return self
+
+    def add(self, book):
+        self._file.write(json.dumps(book, ensure_ascii=False) + "\n")
+
+    def tee(self, books):
+        """Yield `books` unchanged, recording each one."""
+        for book in books: self.add(book); yield book
+
+    def commit(self):
+        self._file.close(); os.replace(self.tmp_path, self.path) # Atomic so a crashed sync never leaves half a state file
+
+    def __exit__(self, *exc_info):
+        if not self._file.closed: self._file.close(); os.remove(self.tmp_path) # Not committed: keep the old state
+
+
+def save_books(url, namespace, books):
+    with StateWriter(url, namespace) as state:
+        for book in books: state.add(book)
+        state.commit()
+
+
+class PageCheckpoint:
+    """Pages of an unfinished scrape, saved as each one completes, so a retry only fetches the missing ones.
+
+        checkpoint = PageCheckpoint(url, "app")
+        if not checkpoint.matches(total_books, first_ids): checkpoint.start(total_books, first_ids)
+        checkpoint.add(page_number, books); ...; checkpoint.clear() # Once the whole shelf is in
+
+    Stored next to the sync state as JSON lines: a {"shelf", "started_at", "total_books", "first_ids"}
+    header, then one {"page", "books"} line per page. A checkpoint only matches while page 1 still
+    reports the same total and review ids, and expires after `ttl` seconds.
+    """
+
+    def __init__(self, url, namespace, ttl=PAGE_CHECKPOINT_TTL):
+        self.path = _state_path(url, namespace)[:-len(".jsonl")] + ".pages.jsonl"; self.shelf = shelf_key(url)
+        self.header = None; self.pages = {} # page number -> books
+        try: f = open(self.path, encoding="utf-8")
+        except OSError: return
+        with f:
+            try: header = json.loads(f.readline() or "{}")
+            except ValueError: return
+            if header.get("shelf") != self.shelf or time.time() - header.get("started_at", 0) > ttl: return
+            self.header = header
+            for line in f:
+                try: page = json.loads(line)
+                except ValueError: continue # A crash can cut the last line short
+                self.pages[page["page"]] = page["books"]
+
+    def matches(self, total_books, first_ids):
+        return bool(self.header) and self.header["total_books"] == total_books and self.header["first_ids"] == list(first_ids)
+
+    def start(self, total_books, first_ids):
+        """Begin a new checkpoint, dropping any pages from an older one."""
+        os.makedirs(STATE_DIR, exist_ok=True)
+        self.header = {"shelf": self.shelf, "started_at": time.time(), "total_books": total_books, "first_ids": list(first_ids)}; self.pages = {}
+        with open(self.path, "w", encoding="utf-8") as f: f.write(json.dumps(self.header) + "\n")
+
+    def add(self, number, books):
+        self.pages[number] = books
+        with open(self.path, "a", encoding="utf-8") as f: f.write(json.dumps({"page": number, "books": books}, ensure_ascii=False) + "\n")
+
+    def clear(self):
+        self.header = None; self.pages = {}
+        try: os.remove(self.path)
+        except OSError: pass
+
+
+def iter_merged(new_books, stored_books):
+    """New reviews (newest first) followed by stored ones, without duplicate review ids; both may be lazy."""
+    seen = set()
+    for book in new_books:
+        if book.get("review_id"): seen.add(book["review_id"])
+        yield book
+    for book in stored_books:
+        if not book.get("review_id") or book["review_id"] not in seen: yield book
+
+
+def merge_books(new_books, stored_books):
+    return list(iter_merged(new_books, stored_books))
@@ -0,0 +1,88 @@
+# spine_cache.py - Persistent spine-color cache keyed by normalized cover URL
+# --- Imports ---
+import os
+import sqlite3
+import threading
+import time
+
+# --- Settings ---
+CACHE_PATH = os.environ.get("SPINE_CACHE_PATH", "spine_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.environ.get("SPINE_CACHE_MAX_ENTRIES", "50000"))
+CACHE_TTL_SECONDS = int(os.environ.get("SPINE_CACHE_TTL", str(30 * 24 * 3600))) # Covers rarely change; 30 days
+
+
+def cache_key(url, mode):
+    return f"{mode} {url}"
+
+
+class SpineColorCache:
+    """Maps a cover URL (size suffix already stripped) and decode mode to its hex spine color.
+
+    The "fast" (reduced-size) and "full" decodes can differ by a shade, so each mode has its
+    own entry (stored under "<mode> <url>"). Entries expire after ``ttl`` seconds; once more than ``max_entries`` are
+    stored the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.path = path; self.max_entries = max_entries; self.ttl = ttl
+        self._lock = threading.Lock() # One connection shared by the cover worker threads
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spine_colors ("
+            " url TEXT PRIMARY KEY, color TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS spine_colors_last_used ON spine_colors (last_used)")
+
+    def get(self, url, mode):
+        url = cache_key(url, mode); now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT color, stored_at FROM spine_colors WHERE url = ?", (url,)).fetchone()
+            if not row: return None
+            color, stored_at = row
+            if self.ttl and now - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM spine_colors WHERE url = ?", (url,)); return None
+            self._conn.execute("UPDATE spine_colors SET last_used = ? WHERE url = ?", (now, url))
+            return color
+
+    def set(self, url, mode, color):
+        url = cache_key(url, mode); now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spine_colors (url, color, stored_at, last_used) VALUES (?, ?, ?, ?)",
+                (url, color, now, now))
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock
+        if self.ttl: self._conn.execute("DELETE FROM spine_colors WHERE stored_at < ?", (time.time() - self.ttl,))
+        if not self.max_entries: return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM spine_colors").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM spine_colors WHERE url IN (SELECT url FROM spine_colors ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,))
+
+    def count(self):
+        with self._lock: return self._conn.execute("SELECT COUNT(*) FROM spine_colors").fetchone()[0]
+
+    def clear(self):
+        with self._lock: self._conn.execute("DELETE FROM spine_colors")
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+
+# --- Shared Instance ---
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache():
+    """Process-wide cache; returns None if CACHE_PATH is empty or unusable."""
+    global _default_cache
+    if not CACHE_PATH: return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try: _default_cache = SpineColorCache()
+            except sqlite3.Error as e: print(f"Warn: Spine cache disabled ({e})"); _default_cache = False
+        return _default_cache or None
@@ -0,0 +1,121 @@
+# spine_colors.py - Spine colors (mean of a cover's left edge strip), one cover or a whole batch
+#
+#     edge_color_from_bytes(jpeg_bytes)            # -> "#5a3b2c"
+#     edge_colors_from_bytes([jpeg_bytes, ...])    # -> ["#5a3b2c", ..., None for covers that don't decode]
+#
+# The batch form sums every edge strip in one NumPy reduction and spreads large batches over a
+# process pool (SPINE_BATCH_PROCESSES). Colors are identical to edge_color_from_bytes: both take the
+# exact per-channel sum over the same decoded pixels, divide by the pixel count and truncate.
+# Without NumPy it falls back to calling edge_color_from_bytes per cover.
+# --- Imports ---
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import metrics
+
+try: from PIL import Image, ImageStat
+except ImportError: Image = None; ImageStat = None
+try: import numpy as np
+except ImportError: np = None
+
+# --- Settings ---
+EDGE_COLOR_MODE = os.environ.get("EDGE_COLOR_MODE", "fast") # "fast" decodes JPEG covers at reduced size, "full" decodes every pixel
+EDGE_DRAFT_SIZE = (64, 96) # Smallest decode size asked of the JPEG decoder in fast mode
+SPINE_BATCH_PROCESSES = int(os.environ.get("SPINE_BATCH_PROCESSES", str(os.cpu_count() or 1))) # Worker processes for large batches (1 = in-process only)
+SPINE_BATCH_MIN_PER_PROCESS = int(os.environ.get("SPINE_BATCH_MIN_PER_PROCESS", "64")) # Smaller batches aren't worth the pickling
+
+
+def decode_cover(image_bytes, mode=None):
+    # "fast" lets libjpeg downscale by 1/2..1/8 while decoding; anything but RGB/L (RGBA, P, CMYK...) becomes RGB
+    with metrics.span("cover_decode"):
+        img = Image.open(io.BytesIO(image_bytes))
+        if (mode or EDGE_COLOR_MODE) == "fast" and img.format == "JPEG": img.draft('RGB', EDGE_DRAFT_SIZE)
+        if img.mode not in ('RGB', 'L'): img = img.convert('RGB')
+        img.load()
+    return img
+
+
+def edge_color_from_bytes(image_bytes, edge_width_percent=10, mode=None):
+    # Average color of the left edge strip
+    img = decode_cover(image_bytes, mode)
+    img_width, img_height = img.size
+    if img_width <= 1 or img_height <= 0: return "#808080"
+    width = max(1, int(img.width * (edge_width_percent / 100)))
+    if width > img_width: width = img_width
+    with metrics.span("edge_stat"): edge = img.crop((0, 0, width, img.height)); stat = ImageStat.Stat(edge)
+    avg_color = (128,128,128);
+    if hasattr(stat, 'mean') and stat.mean:
+         avg_color_float = stat.mean
+         if isinstance(avg_color_float, (list, tuple)) and len(avg_color_float) >= 1:
+             avg_color = tuple(int(c) for c in avg_color_float[:3])
+             if len(avg_color) == 1: avg_color = (avg_color[0],)*3
+         elif isinstance(avg_color_float, (int, float)):
+             gray_val = int(avg_color_float); avg_color = (gray_val,)*3
+    if len(avg_color) < 3: avg_color = (avg_color[0],)*3 if len(avg_color)>0 else (128,)*3
+    return "#{:02x}{:02x}{:02x}".format(*avg_color[:3])
+
+
+# --- Batch ---
+def _edge_pixels(image_bytes, edge_width_percent, mode):
+    """(pixels, 3) uint8 array of the cover's edge strip, "#808080" for a degenerate image, or None if it won't decode."""
+    try: img = decode_cover(image_bytes, mode)
+    except Exception: return None
+    if img.width <= 1 or img.height <= 0: return "#808080"
+    width = min(img.width, max(1, int(img.width * (edge_width_percent / 100))))
+    strip = np.asarray(img.crop((0, 0, width, img.height)))
+    if strip.ndim == 2: return np.repeat(strip.reshape(-1, 1), 3, axis=1) # L: the gray mean is used for all three channels
+    return strip.reshape(-1, strip.shape[-1])
+
+
+def _edge_colors_numpy(buffers, edge_width_percent=10, mode=None):
+    colors = [None] * len(buffers); strips = []; owners = []
+    for i, image_bytes in enumerate(buffers):
+        pixels = _edge_pixels(image_bytes, edge_width_percent, mode)
+        if isinstance(pixels, str) or pixels is None: colors[i] = pixels
+        else: strips.append(pixels); owners.append(i)
+    if not strips: return colors
+    with metrics.span("edge_stat"):
+        counts = np.array([len(s) for s in strips]); starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.add.reduceat(np.concatenate(strips), starts, axis=0, dtype=np.int64) # Exact, like ImageStat's histogram sums
+        means = (sums / counts[:, None]).astype(np.int64) # Same float division and truncation as int(stat.mean[c])
+    for i, (r, g, b) in zip(owners, means.tolist()): colors[i] = f"#{r:02x}{g:02x}{b:02x}"
+    return colors
+
+
+def _edge_colors_fallback(buffers, edge_width_percent=10, mode=None):
+    colors = []
+    for image_bytes in buffers:
+        try: colors.append(edge_color_from_bytes(image_bytes, edge_width_percent, mode))
+        except Exception: colors.append(None)
+    return colors
+
+
+_pool = None; _pool_processes = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(processes):
+    # Spawned rather than forked: the app forks from a process full of threads holding locks.
+    # A different `processes` replaces the pool; batches already submitted to the old one still finish.
+    global _pool, _pool_processes
+    with _pool_lock:
+        if _pool is not None and _pool_processes != processes: _pool.shutdown(wait=False); _pool = None
+        if _pool is None: _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")); _pool_processes = processes
+        return _pool
+
+
+def edge_colors_from_bytes(buffers, edge_width_percent=10, mode=None, processes=None):
+    """Spine colors for many encoded covers, in order; None where a cover can't be decoded.
+
+    Batches of at least 2 * SPINE_BATCH_MIN_PER_PROCESS covers are split across up to `processes`
+    worker processes (default SPINE_BATCH_PROCESSES); stage timings from the workers are not recorded.
+    """
+    if not Image: return ["#808080"] * len(buffers)
+    compute = _edge_colors_numpy if np is not None else _edge_colors_fallback
+    processes = min(processes or SPINE_BATCH_PROCESSES, len(buffers) // max(1, SPINE_BATCH_MIN_PER_PROCESS))
+    if processes < 2: return compute(buffers, edge_width_percent, mode)
+    size = -(-len(buffers) // processes); pool = _get_pool(processes)
+    chunks = [pool.submit(compute, buffers[i:i + size], edge_width_percent, mode) for i in range(0, len(buffers), size)]
+    return [color for chunk in chunks for color in chunk.result()]
@@ -0,0 +1,49 @@
+# test_app_export.py - Rows app.get_books_from_shelf exports carry the full record, spine color included
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("PIL")
+import app
+import cover_store
+import http_client
+import http_replay
+import shelf_export
+import shelf_sync
+import spine_cache
+from shelf_fixtures import render_shelf_page
+from shelf_scraper import high_res_cover_url
+
+URL = "https://www.goodreads.com/review/list/1-export?shelf=read"
+
+
+@pytest.fixture
+def replayed_shelf(tmp_path, monkeypatch):
+    """A 12-book shelf with every field set, served from a replay archive; all caches in tmp_path."""
+    books = [{"title": f"Book {i}", "author": f"Author {i}", "publisher": f"Press {i}", "rating": "liked it", "review": f"Review {i}",
+              "image": f"https://i.gr-assets.com/images/books/{i}._SX50_.jpg"} for i in range(12)]
+    archive = http_replay.Archive(str(tmp_path / "archive"))
+    for page in (1, 2):
+        archive.save(f"{URL}&page={page}", 200, {"Content-Type": "text/html; charset=utf-8"}, render_shelf_page(books, page, len(books)).encode("utf-8"))
+    for book in books:
+        cover_url = high_res_cover_url(book["image"]); archive.save(cover_url, 200, {"Content-Type": "image/jpeg"}, http_replay.fixture_cover(cover_url))
+    monkeypatch.setattr(http_replay, "HTTP_ARCHIVE_DIR", archive.root)
+    monkeypatch.setattr(http_client, "_default_client", http_client.HttpClient(transport="replay", retries=0))
+    monkeypatch.setattr(cover_store, "_default_store", cover_store.CoverStore(str(tmp_path / "covers")))
+    monkeypatch.setattr(spine_cache, "CACHE_PATH", "")
+    monkeypatch.setattr(shelf_sync, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(shelf_export, "SHELF_EXPORT_JSONL", str(tmp_path / "export.jsonl"))
+    return tmp_path / "export.jsonl"
+
+
+def test_exported_rows_have_every_field(replayed_shelf):
+    books = app.get_books_from_shelf(URL, incremental=False)
+    assert len(books) == 12
+    with open(replayed_shelf, encoding="utf-8") as f: rows = [json.loads(line) for line in f]
+    assert len(rows) == 12
+    for row, book in zip(rows, books):
+        assert set(row) == set(shelf_export.COLUMNS)
+        assert all(row[field] is not None for field in shelf_export.FIELDS), row
+        assert row["rating"] == "liked it" and row["review"].startswith("Review ")
+        assert row["spine_color"] == book["spine_color"] and row["spine_color"].startswith("#")
@@ -0,0 +1,59 @@
+# test_generate_html.py - Card escaping, streamed count/page patching and stale page cleanup
+import re
+
+from generate_html import generate_html, page_path, render_book
+
+
+def book(i, **fields):
+    return {"review_id": str(i), "title": f"Book {i}", "author": f"Author {i}", "image": f"https://i.gr-assets.com/{i}.jpg",
+            "rating": "4 of 5 stars", "review": None, **fields}
+
+
+def test_render_book_escapes_every_field():
+    html = render_book(book(1, title='<script>alert("x")</script>', author="Tom & Jerry", review="<b>great</b>",
+                            image='https://x/"onerror="alert(1)'))
+    assert "<script>" not in html and "<b>" not in html
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;" in html
+    assert "Tom &amp; Jerry" in html
+    assert 'src="https://x/&quot;onerror=&quot;alert(1)"' in html
+    assert 'loading="lazy"' in html
+
+
+def test_render_book_handles_missing_fields():
+    html = render_book({"title": None, "author": None, "image": None, "rating": None, "review": None})
+    assert 'src=""' in html and "N/R" in html
+
+
+def test_single_page_count_is_patched_in(tmp_path):
+    out = str(tmp_path / "index.html")
+    assert generate_html((book(i) for i in range(7)), out) == 7
+    html = open(out, encoding="utf-8").read()
+    assert re.search(r"<strong>7\s*</strong> books read", html)
+    assert html.count('class="book"') == 7 and "Page 1 of" not in html
+
+
+def test_paginated_pages_link_and_report_totals(tmp_path):
+    out = str(tmp_path / "index.html")
+    assert generate_html((book(i) for i in range(5)), out, page_size=2) == 5
+    pages = [open(page_path(out, n), encoding="utf-8").read() for n in (1, 2, 3)]
+    assert [p.count('class="book"') for p in pages] == [2, 2, 1]
+    for n, html in enumerate(pages, 1):
+        assert re.search(r"<strong>5\s*</strong> books read", html)
+        assert re.search(rf"Page {n} of 3\s*</span>", html)
+    assert 'href="index-2.html">Older' in pages[0] and 'href="index.html">← Newer' in pages[1]
+    assert "Older" not in pages[2]
+
+
+def test_stale_pages_are_removed_only_when_paginating(tmp_path):
+    out = str(tmp_path / "index.html")
+    generate_html((book(i) for i in range(6)), out, page_size=2)
+    generate_html((book(i) for i in range(3)), out, page_size=2) # Shorter run: index-3.html is stale
+    assert (tmp_path / "index-2.html").exists() and not (tmp_path / "index-3.html").exists()
+    generate_html((book(i) for i in range(3)), out) # Single page: siblings are left alone
+    assert (tmp_path / "index-2.html").exists()
+
+
+def test_empty_shelf_still_writes_a_page(tmp_path):
+    out = str(tmp_path / "index.html")
+    assert generate_html([], out, page_size=10) == 0
+    assert re.search(r"<strong>0\s*</strong> books read", open(out, encoding="utf-8").read())
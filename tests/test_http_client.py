@@ -0,0 +1,78 @@
+# test_http_client.py - HttpClient retries, backoff and Retry-After, over a scripted transport adapter
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import http_client
+from http_client import HttpClient, retry_after_seconds
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Answers each request with the next scripted item: an HTTP status (optionally with headers) or an exception."""
+
+    def __init__(self, script):
+        super().__init__(); self.script = list(script); self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1; item = self.script.pop(0)
+        if isinstance(item, Exception): raise item
+        status, headers = item if isinstance(item, tuple) else (item, {})
+        response = requests.models.Response(); response.status_code = status; response.headers.update(headers)
+        response._content = b"body"; response.url = request.url; response.request = request
+        return response
+
+    def close(self): pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []; monkeypatch.setattr(http_client.time, "sleep", slept.append)
+    return slept
+
+
+def make_client(script, **kwargs):
+    client = HttpClient(transport="live", **kwargs); adapter = ScriptedAdapter(script)
+    client.session.mount("https://", adapter)
+    return client, adapter
+
+
+def test_retries_5xx_until_success(sleeps):
+    client, adapter = make_client([503, 502, 200], retries=3, backoff=0.5)
+    assert client.get("https://example.com/a").status_code == 200
+    assert adapter.calls == 3 and len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.5 and 0 <= sleeps[1] <= 1.0 # Full jitter over a doubling window
+    assert client.stats()["retries"] == 2 and client.stats()["failures"] == 0
+
+
+def test_gives_up_after_retries_and_returns_last_response(sleeps):
+    client, adapter = make_client([500, 500, 500], retries=2)
+    response = client.get("https://example.com/a")
+    assert response.status_code == 500 and adapter.calls == 3
+    assert client.stats()["failures"] == 1
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client, adapter = make_client([404])
+    assert client.get("https://example.com/a").status_code == 404
+    assert adapter.calls == 1 and sleeps == []
+
+
+def test_retry_after_takes_precedence_and_is_capped(sleeps):
+    client, _ = make_client([(429, {"Retry-After": "7"}), (503, {"Retry-After": "120"}), 200], backoff=0.01, backoff_max=30)
+    assert client.get("https://example.com/a").status_code == 200
+    assert sleeps == [7.0, 30]
+
+
+def test_connection_errors_are_retried_then_raised(sleeps):
+    client, adapter = make_client([requests.exceptions.ConnectionError("down")] * 3, retries=2)
+    with pytest.raises(requests.exceptions.ConnectionError): client.get("https://example.com/a")
+    assert adapter.calls == 3 and client.stats()["failures"] == 1
+
+
+def test_retry_after_seconds_parses_delta_and_http_date(monkeypatch):
+    response = requests.models.Response()
+    assert retry_after_seconds(response) is None
+    response.headers["Retry-After"] = "12"; assert retry_after_seconds(response) == 12.0
+    monkeypatch.setattr(http_client.time, "time", lambda: 784111767.0) # Sun, 06 Nov 1994 08:49:27 GMT
+    response.headers["Retry-After"] = "Sun, 06 Nov 1994 08:49:37 GMT"; assert retry_after_seconds(response) == pytest.approx(10.0)
+    response.headers["Retry-After"] = "soon"; assert retry_after_seconds(response) is None
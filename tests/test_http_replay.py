@@ -0,0 +1,68 @@
+# test_http_replay.py - Record/replay round trip through the transport adapters and HttpClient
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_replay
+from http_client import HttpClient
+from http_replay import Archive, RecordingAdapter, ReplayAdapter
+from shelf_scraper import iter_shelf_pages, high_res_cover_url, RateLimiter
+
+PAGE_URL = "https://www.goodreads.com/review/list/1-test?shelf=read&page=1"
+
+
+def fake_live_send(self, request, **kwargs):
+    # Stands in for the network behind RecordingAdapter's HTTPAdapter.send
+    response = requests.models.Response(); response.status_code = 404 if "missing" in request.url else 200
+    response.headers.update({"Content-Type": "text/html; charset=utf-8", "ETag": '"v1"', "Set-Cookie": "secret=1"})
+    response._content = f"<html>{request.url}</html>".encode("utf-8"); response.url = request.url; response.request = request
+    return response
+
+
+def get(adapter, url, headers=None):
+    session = requests.Session(); session.mount("https://", adapter)
+    return session.get(url, headers=headers or {})
+
+
+def test_record_then_replay_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(HTTPAdapter, "send", fake_live_send)
+    archive = Archive(str(tmp_path))
+    recorded = get(RecordingAdapter(archive), PAGE_URL)
+    assert get(RecordingAdapter(archive), PAGE_URL.replace("1-test", "missing")).status_code == 404
+
+    replayed = get(ReplayAdapter(archive), PAGE_URL)
+    assert replayed.status_code == 200 and replayed.text == recorded.text
+    assert replayed.headers["X-Replay"] == "hit" and replayed.headers["ETag"] == '"v1"'
+    assert "Set-Cookie" not in replayed.headers # Only KEPT_HEADERS are archived
+    assert archive.load(PAGE_URL.replace("1-test", "missing")) is None # Errors aren't recorded
+
+
+def test_replay_miss_and_conditional_requests(tmp_path):
+    archive = Archive(str(tmp_path)); archive.save(PAGE_URL, 200, {"Content-Type": "text/html", "ETag": '"v1"'}, b"<html></html>")
+    adapter = ReplayAdapter(archive)
+    missing = get(adapter, PAGE_URL.replace("page=1", "page=2"))
+    assert missing.status_code == 404 and missing.headers["X-Replay"] == "miss"
+    assert get(adapter, PAGE_URL, {"If-None-Match": '"v1"'}).status_code == 304
+    assert get(adapter, PAGE_URL, {"If-None-Match": '"v0"'}).status_code == 200
+
+
+def test_injected_errors_are_repeatable(tmp_path):
+    archive = Archive(str(tmp_path)); archive.save(PAGE_URL, 200, {"Content-Type": "text/html"}, b"ok")
+    def statuses():
+        adapter = ReplayAdapter(archive, error_rate=0.5, seed="7")
+        return [get(adapter, PAGE_URL).status_code for _ in range(20)]
+    first = statuses()
+    assert set(first) == {200, 503} and statuses() == first # Same seed, same failures
+    assert get(ReplayAdapter(archive, error_rate=1.0), PAGE_URL).headers["X-Replay"] == "injected-error"
+
+
+def test_seeded_fixture_shelf_replays_through_http_client(tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    monkeypatch.setattr(http_replay, "HTTP_ARCHIVE_DIR", str(tmp_path))
+    http_replay.seed_archive(str(tmp_path), sizes=[45])
+    client = HttpClient(transport="replay", retries=0)
+    pages = list(iter_shelf_pages(http_replay.FIXTURE_SHELF_URL.format(size=45), client=client, limiter=RateLimiter(0)))
+    books = [b for p in pages for b in p.books]
+    assert [p.number for p in pages] == [1, 2] and len(books) == 45
+    cover = client.get(high_res_cover_url(books[0]["image"]))
+    assert cover.headers["X-Replay"] == "hit" and cover.content[:2] == b"\xff\xd8"
@@ -0,0 +1,67 @@
+# test_page_retry.py - Background page retries: one attempt at a time, requests during a retry join it
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+import app
+
+URL = "https://www.goodreads.com/review/list/1-retry?shelf=read"
+
+
+class FakeJob:
+    def __init__(self, progress): self.progress = progress
+    def wait(self): pass
+
+
+class FakeJobs:
+    """Stands in for app.jobs: each submit is one scrape that leaves `failed` pages, scheduling retries like get_books_cached."""
+    def __init__(self, failed): self.failed = list(failed); self.submitted = 0; self.done = threading.Event()
+    def submit(self, url):
+        self.submitted += 1; failed = self.failed.pop(0) if self.failed else []
+        progress = {"failed_pages": failed}
+        if failed: progress["retry"] = app.schedule_page_retry(url) # A request arriving while the retry runs
+        if not self.failed: self.done.set()
+        return FakeJob(progress)
+
+
+@pytest.fixture
+def retries(monkeypatch):
+    monkeypatch.setattr(app, "_page_retries", {})
+    monkeypatch.setattr(app, "PAGE_RETRY_DELAYS", (0.01, 0.01, 0.01))
+    yield
+    for state in app._page_retries.values():
+        if state["timer"]: state["timer"].cancel()
+
+
+def _wait_idle(timeout=5):
+    for _ in range(int(timeout / 0.01)):
+        with app._page_retries_lock:
+            if not any(s["timer"] or s["running"] for s in app._page_retries.values()): return
+        threading.Event().wait(0.01)
+    raise AssertionError("retries never settled")
+
+
+def test_request_during_a_running_retry_joins_it(retries, monkeypatch):
+    jobs = FakeJobs(failed=[[3], [3]]); monkeypatch.setattr(app, "jobs", jobs)
+    first = app.schedule_page_retry(URL)
+    assert first["attempt"] == 1
+    assert jobs.done.wait(5); _wait_idle()
+    # Two failing runs, then one clean one: every attempt ran once, none double-booked
+    assert jobs.submitted == 3
+    assert app._page_retries == {}
+
+
+def test_retries_stop_after_the_last_delay(retries, monkeypatch):
+    jobs = FakeJobs(failed=[[2]] * 10); monkeypatch.setattr(app, "jobs", jobs)
+    app.schedule_page_retry(URL); _wait_idle(); threading.Event().wait(0.05); _wait_idle()
+    assert jobs.submitted == len(app.PAGE_RETRY_DELAYS)
+    assert app._page_retries == {}
+
+
+def test_queued_retry_is_reported_not_requeued(retries, monkeypatch):
+    monkeypatch.setattr(app, "PAGE_RETRY_DELAYS", (60,))
+    first = app.schedule_page_retry(URL); again = app.schedule_page_retry(URL)
+    assert again == first
+    app.forget_page_retries(URL)
+    assert app._page_retries == {}
@@ -0,0 +1,48 @@
+# test_shelf_cache.py - Expired shelf results revalidate against page 1 the way app.py cached them
+import requests
+
+import shelf_cache
+from shelf_cache import ShelfResultCache, REVALIDATED, EXPIRED
+from shelf_fixtures import render_shelf_page
+from shelf_scraper import fetch_shelf_head, iter_shelf_pages, RateLimiter
+
+URL = "https://www.goodreads.com/review/list/1-cache?shelf=read"
+
+
+class FakeClient:
+    def __init__(self, books, first_review_id=9_000_000_000): self.books = books; self.first_review_id = first_review_id
+    def get(self, url, timeout=None, **kwargs):
+        page = int(url.rsplit("page=", 1)[1])
+        response = requests.models.Response(); response.url = url; response.encoding = "utf-8"; response.status_code = 200
+        response._content = render_shelf_page(self.books, page, len(self.books), first_review_id=self.first_review_id).encode("utf-8")
+        return response
+
+
+def make_books(count, missing=()):
+    return [{"title": f"Book {i}", "author": "" if i in missing else f"Author {i}", "image": f"https://i.gr-assets.com/{i}._SX50_.jpg",
+             "rating": "liked it", "review": None, "publisher": None} for i in range(count)]
+
+
+def cached_result(books):
+    """The books app.get_books_from_shelf would store: parsed rows with both title and author."""
+    pages = iter_shelf_pages(URL, client=FakeClient(books), limiter=RateLimiter(0))
+    return [b for p in pages for b in p.books if b["title"] and b["author"]]
+
+
+def expired_cache(monkeypatch, served):
+    monkeypatch.setattr(shelf_cache, "fetch_shelf_head", lambda url, validators=None: fetch_shelf_head(url, validators, client=served))
+    return ShelfResultCache(cache_dir="", ttl=-1)
+
+
+def test_rows_without_an_author_still_revalidate(monkeypatch):
+    books = make_books(40, missing={3, 31})
+    cache = expired_cache(monkeypatch, FakeClient(books)); cache.store(URL, cached_result(books), {"total_books": len(books)})
+    entry, status = cache.lookup(URL)
+    assert status == REVALIDATED and entry is not None
+
+
+def test_changed_first_page_expires(monkeypatch):
+    books = make_books(40, missing={3})
+    cache = expired_cache(monkeypatch, FakeClient(books, first_review_id=9_000_000_001)) # Same rows and total, different reviews
+    cache.store(URL, cached_result(books), {"total_books": len(books)})
+    assert cache.lookup(URL) == (None, EXPIRED)
@@ -0,0 +1,131 @@
+# test_shelf_scraper.py - iter_shelf_pages paging and incremental cutoffs against rendered fixture pages
+import requests
+
+from shelf_fixtures import render_shelf_page
+from shelf_scraper import iter_shelf_pages, RateLimiter, PageFetchError
+import shelf_scraper
+
+URL = "https://www.goodreads.com/review/list/1-test?shelf=read"
+PER_PAGE = 10
+
+
+def make_books(count):
+    return [{"title": f"Book {i}", "author": f"Author {i}", "image": f"https://i.gr-assets.com/{i}._SX50_.jpg",
+             "rating": "liked it", "review": None, "publisher": None} for i in range(count)]
+
+
+class FakeClient:
+    """Serves rendered shelf pages; `fail` maps page number -> HTTP status to answer instead."""
+
+    def __init__(self, books, total_books=None, fail=None):
+        self.books = books; self.total_books = len(books) if total_books is None else total_books
+        self.fail = fail or {}; self.fetched = []
+
+    def get(self, url, timeout=None, **kwargs):
+        page = int(url.rsplit("page=", 1)[1]); self.fetched.append(page)
+        response = requests.models.Response(); response.url = url; response.encoding = "utf-8"
+        response.status_code = self.fail.get(page, 200)
+        response._content = render_shelf_page(self.books, page, self.total_books, per_page=PER_PAGE).encode("utf-8")
+        return response
+
+
+def walk(client, **kwargs):
+    return list(iter_shelf_pages(URL, client=client, limiter=RateLimiter(0), page_workers=2, **kwargs))
+
+
+def review_ids(pages):
+    return [b["review_id"] for p in pages for b in (p.books or [])]
+
+
+def test_walks_every_counted_page_in_order():
+    client = FakeClient(make_books(25))
+    pages = walk(client)
+    assert [p.number for p in pages] == [1, 2, 3]
+    assert [len(p.books) for p in pages] == [10, 10, 5]
+    assert sorted(client.fetched) == [1, 2, 3] # The count says page 3 is the last; no empty page 4 request
+    assert pages[0].total_books == 25
+
+
+def test_without_a_count_pages_are_fetched_until_an_empty_one():
+    client = FakeClient(make_books(15), total_books=0)
+    pages = walk(client)
+    assert [len(p.books) for p in pages] == [10, 5]
+    assert client.fetched == [1, 2, 3]
+
+
+def test_known_ids_cut_the_page_holding_the_first_stored_review():
+    books = make_books(40); everything = review_ids(walk(FakeClient(books)))
+    stored = everything[13:] # Last sync stored 27 reviews; 13 are new
+    client = FakeClient(books)
+    pages = walk(client, known_ids=set(stored), stored_count=len(stored))
+    assert review_ids(pages) == everything[:13]
+    assert [p.number for p in pages] == [1, 2]
+    assert max(client.fetched) == 2 # Pages past the cut are never requested
+
+
+def test_known_ids_on_page_one_stop_immediately():
+    books = make_books(30); everything = review_ids(walk(FakeClient(books)))
+    client = FakeClient(books)
+    pages = walk(client, known_ids=set(everything), stored_count=30)
+    assert [(p.number, p.books) for p in pages] == [(1, [])]
+    assert client.fetched == [1]
+
+
+def test_failed_page_raises_by_default():
+    client = FakeClient(make_books(30), fail={2: 404})
+    try: walk(client); assert False, "expected PageFetchError"
+    except PageFetchError as e: assert e.page == 2
+
+
+
+# --- Resuming And Failed Pages ---
+def test_skip_pages_are_yielded_without_fetching():
+    client = FakeClient(make_books(40))
+    pages = walk(client, skip_pages={2, 3})
+    assert [(p.number, p.books is None) for p in pages] == [(1, False), (2, True), (3, True), (4, False)]
+    assert sorted(client.fetched) == [1, 4]
+
+
+def test_skip_pages_callback_sees_page_one():
+    client = FakeClient(make_books(30)); seen = []
+    pages = walk(client, skip_pages=lambda first: seen.append((first.number, len(first.books), first.total_books)) or {1, 3})
+    assert seen == [(1, 10, 30)]
+    assert [p.books is None for p in pages] == [False, False, True] # Page 1 is always fetched and yielded
+    assert sorted(client.fetched) == [1, 2]
+
+
+def test_skip_failed_yields_the_error_and_keeps_walking_counted_pages():
+    client = FakeClient(make_books(40), fail={2: 503, 3: 404})
+    pages = walk(client, skip_failed=True)
+    assert [p.number for p in pages] == [1, 2, 3, 4]
+    assert [bool(p.error) for p in pages] == [False, True, True, False] and pages[1].books == []
+    assert "404" in pages[2].error
+
+
+def test_skip_failed_without_a_count_keeps_probing():
+    client = FakeClient(make_books(40), total_books=0, fail={2: 500})
+    pages = walk(client, skip_failed=True)
+    assert [(p.number, bool(p.error)) for p in pages] == [(1, False), (2, True), (3, False), (4, False)]
+    assert client.fetched == [1, 2, 3, 4, 5] # Until the empty page past the end
+
+
+def test_skip_failed_without_a_count_gives_up_after_failures_in_a_row(monkeypatch):
+    monkeypatch.setattr(shelf_scraper, "PAGE_PROBE_FAILURES", 2)
+    client = FakeClient(make_books(60), total_books=0, fail={2: 500, 4: 500, 5: 503})
+    pages = walk(client, skip_failed=True)
+    assert [(p.number, bool(p.error)) for p in pages] == [(1, False), (2, True), (3, False), (4, True), (5, True)]
+
+
+def test_first_page_failure_still_raises():
+    client = FakeClient(make_books(30), fail={1: 404})
+    try: walk(client, skip_failed=True); assert False, "expected PageFetchError"
+    except PageFetchError as e: assert e.page == 1
+
+
+def test_skipped_cut_page_ends_an_incremental_walk():
+    books = make_books(40); everything = review_ids(walk(FakeClient(books)))
+    stored = everything[13:] # The cut falls on page 2, the last one worth fetching
+    client = FakeClient(books)
+    pages = walk(client, known_ids=set(stored), stored_count=len(stored), skip_pages={2})
+    assert [(p.number, p.books is None) for p in pages] == [(1, False), (2, True)]
+    assert client.fetched == [1] # No extra fetch of page 3 past the checkpointed cut page
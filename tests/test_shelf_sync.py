@@ -0,0 +1,87 @@
+# test_shelf_sync.py - Shelf keys, merging and the StateWriter commit/rollback contract
+import os
+
+import pytest
+
+import shelf_sync
+from shelf_sync import StateWriter, iter_merged, shelf_key
+
+URL = "https://www.goodreads.com/review/list/1-test?shelf=read&sort=date_read"
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shelf_sync, "STATE_DIR", str(tmp_path / "state"))
+    return tmp_path / "state"
+
+
+def test_shelf_key_ignores_page_and_param_order():
+    assert shelf_key(URL + "&page=3") == shelf_key("https://WWW.goodreads.com/review/list/1-test/?sort=date_read&shelf=read")
+
+
+def test_iter_merged_puts_new_first_without_duplicates():
+    new = [{"review_id": "5"}, {"review_id": "4"}]
+    stored = [{"review_id": "4", "title": "old copy"}, {"review_id": "3"}, {"review_id": None, "title": "no id"}]
+    merged = list(iter_merged(iter(new), iter(stored)))
+    assert [b["review_id"] for b in merged] == ["5", "4", "3", None]
+    assert merged[1] is new[1] # The fresh copy wins
+
+
+def test_state_writer_commit_replaces_state():
+    shelf_sync.save_books(URL, "test", [{"review_id": "1"}])
+    with StateWriter(URL, "test") as state:
+        assert list(state.tee([{"review_id": "2"}, {"review_id": "1"}])) == [{"review_id": "2"}, {"review_id": "1"}]
+        assert shelf_sync.stored_ids(URL, "test") == ["1"] # Nothing visible before commit
+        state.commit()
+    assert shelf_sync.load_books(URL, "test") == [{"review_id": "2"}, {"review_id": "1"}]
+
+
+def test_state_writer_without_commit_keeps_old_state(state_dir):
+    shelf_sync.save_books(URL, "test", [{"review_id": "1"}])
+    with pytest.raises(RuntimeError):
+        with StateWriter(URL, "test") as state:
+            state.add({"review_id": "2"}); raise RuntimeError("scrape failed")
+    assert shelf_sync.stored_ids(URL, "test") == ["1"]
+    assert not [name for name in os.listdir(state_dir) if name.endswith(".tmp")]
+
+
+def test_state_of_another_shelf_is_ignored():
+    shelf_sync.save_books(URL, "test", [{"review_id": "1"}])
+    assert shelf_sync.load_books(URL.replace("1-test", "2-other"), "test") == []
+    assert shelf_sync.load_books(URL, "other-namespace") == []
+
+
+# --- Page Checkpoints ---
+def test_page_checkpoint_resumes_only_while_page_one_matches():
+    checkpoint = shelf_sync.PageCheckpoint(URL, "app")
+    assert not checkpoint.matches(60, ["a", "b"])
+    checkpoint.start(60, ["a", "b"]); checkpoint.add(2, [{"review_id": "c", "spine_color": "#010203"}])
+    reloaded = shelf_sync.PageCheckpoint(URL, "app")
+    assert reloaded.matches(60, ["a", "b"]) and reloaded.pages == {2: [{"review_id": "c", "spine_color": "#010203"}]}
+    assert not reloaded.matches(61, ["a", "b"]) # New review: pages have shifted
+    assert not reloaded.matches(60, ["z", "a"])
+    reloaded.start(61, ["z", "a"]) # Starting over drops the old pages
+    assert shelf_sync.PageCheckpoint(URL, "app").pages == {}
+
+
+def test_page_checkpoint_expires(monkeypatch):
+    shelf_sync.PageCheckpoint(URL, "app").start(30, ["a"])
+    assert shelf_sync.PageCheckpoint(URL, "app", ttl=60).matches(30, ["a"])
+    real_time = shelf_sync.time.time; monkeypatch.setattr(shelf_sync.time, "time", lambda: real_time() + 61)
+    expired = shelf_sync.PageCheckpoint(URL, "app", ttl=60)
+    assert expired.header is None and not expired.matches(30, ["a"])
+
+
+def test_page_checkpoint_skips_a_truncated_last_line():
+    checkpoint = shelf_sync.PageCheckpoint(URL, "app"); checkpoint.start(90, ["a"])
+    checkpoint.add(2, [{"review_id": "b"}])
+    with open(checkpoint.path, "a", encoding="utf-8") as f: f.write('{"page": 3, "books": [{"revi') # Crash mid-write
+    assert shelf_sync.PageCheckpoint(URL, "app").pages == {2: [{"review_id": "b"}]}
+
+
+def test_page_checkpoint_clear_and_shelf_isolation():
+    checkpoint = shelf_sync.PageCheckpoint(URL, "app"); checkpoint.start(30, ["a"]); checkpoint.add(1, [])
+    assert shelf_sync.PageCheckpoint(URL.replace("1-test", "2-other"), "app").header is None
+    assert shelf_sync.load_books(URL, "app") == [] # Separate from the sync state
+    checkpoint.clear()
+    assert not os.path.exists(checkpoint.path) and shelf_sync.PageCheckpoint(URL, "app").header is None
@@ -0,0 +1,38 @@
+# test_spine_cache.py - SpineColorCache TTL, LRU eviction and per-mode keys
+import spine_cache
+from spine_cache import SpineColorCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return SpineColorCache(str(tmp_path / "spine.sqlite3"), **kwargs)
+
+
+def test_round_trip_and_mode_is_part_of_the_key(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("https://covers/1.jpg", "fast", "#102030")
+    assert cache.get("https://covers/1.jpg", "fast") == "#102030"
+    assert cache.get("https://covers/1.jpg", "full") is None
+    cache.set("https://covers/1.jpg", "full", "#112131")
+    assert cache.get("https://covers/1.jpg", "fast") == "#102030"
+    assert cache.count() == 2
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    now = [1000.0]; monkeypatch.setattr(spine_cache.time, "time", lambda: now[0])
+    cache = make_cache(tmp_path, ttl=60)
+    cache.set("u", "fast", "#000001")
+    now[0] += 59; assert cache.get("u", "fast") == "#000001"
+    now[0] += 2; assert cache.get("u", "fast") is None
+    assert cache.count() == 0 # Expired rows are deleted on lookup
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]; monkeypatch.setattr(spine_cache.time, "time", lambda: now[0])
+    cache = make_cache(tmp_path, max_entries=2, ttl=0)
+    cache.set("a", "fast", "#00000a"); now[0] += 1
+    cache.set("b", "fast", "#00000b"); now[0] += 1
+    assert cache.get("a", "fast") == "#00000a"; now[0] += 1 # "a" is now more recent than "b"
+    cache.set("c", "fast", "#00000c")
+    assert cache.count() == 2
+    assert cache.get("b", "fast") is None
+    assert cache.get("a", "fast") == "#00000a" and cache.get("c", "fast") == "#00000c"
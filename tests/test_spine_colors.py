@@ -0,0 +1,65 @@
+# test_spine_colors.py - The NumPy batch path must give exactly edge_color_from_bytes' colors
+import io
+import random
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+import spine_colors
+from spine_colors import edge_color_from_bytes, edge_colors_from_bytes
+
+
+def encode(img, fmt):
+    out = io.BytesIO(); img.save(out, fmt); return out.getvalue()
+
+
+def cover_mix(count=60, seed=1):
+    """Noisy covers in every mode the decoder normalizes (L, RGBA, P, CMYK, LA...), PNG and JPEG, down to 1px wide."""
+    rnd = random.Random(seed); blobs = []
+    for i in range(count):
+        size = (rnd.choice([1, 2, 7, rnd.randint(8, 200)]), rnd.randint(1, 300))
+        img = Image.effect_noise(size, rnd.randint(10, 100)).convert("RGB")
+        mode = ["RGB", "L", "RGBA", "P", "CMYK", "LA"][i % 6]
+        img = img.convert("P", palette=Image.ADAPTIVE) if mode == "P" else img.convert(mode)
+        blobs.append(encode(img, "JPEG" if mode == "CMYK" or (mode in ("RGB", "L") and i % 2) else "PNG"))
+    return blobs
+
+
+@pytest.mark.parametrize("edge_width_percent", [10, 3, 100])
+@pytest.mark.parametrize("mode", ["fast", "full"])
+def test_batch_matches_single_cover_colors(edge_width_percent, mode):
+    pytest.importorskip("numpy")
+    blobs = cover_mix()
+    expected = [edge_color_from_bytes(b, edge_width_percent, mode) for b in blobs]
+    assert edge_colors_from_bytes(blobs, edge_width_percent, mode, processes=1) == expected
+
+
+def test_undecodable_covers_come_back_as_none():
+    blobs = [encode(Image.new("RGB", (40, 60), (200, 10, 10)), "PNG"), b"not an image", b""]
+    assert edge_colors_from_bytes(blobs, processes=1) == ["#c80a0a", None, None]
+
+
+def test_fallback_without_numpy_gives_the_same_colors(monkeypatch):
+    blobs = cover_mix(20) + [b"junk"]
+    expected = edge_colors_from_bytes(blobs, processes=1)
+    monkeypatch.setattr(spine_colors, "np", None)
+    assert edge_colors_from_bytes(blobs, processes=1) == expected
+
+
+def test_large_batches_split_across_processes_keep_order(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(spine_colors, "SPINE_BATCH_MIN_PER_PROCESS", 8)
+    blobs = cover_mix(40, seed=2)
+    assert edge_colors_from_bytes(blobs, processes=2) == edge_colors_from_bytes(blobs, processes=1)
+
+
+def test_pool_follows_the_requested_process_count(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(spine_colors, "SPINE_BATCH_MIN_PER_PROCESS", 8)
+    blobs = cover_mix(48, seed=3); expected = edge_colors_from_bytes(blobs, processes=1)
+    assert edge_colors_from_bytes(blobs, processes=2) == expected
+    two = spine_colors._pool; assert two._max_workers == 2
+    assert edge_colors_from_bytes(blobs, processes=3) == expected
+    assert spine_colors._pool is not two and spine_colors._pool._max_workers == 3
+    three = spine_colors._pool; edge_colors_from_bytes(blobs, processes=3)
+    assert spine_colors._pool is three # Same count: the pool is reused